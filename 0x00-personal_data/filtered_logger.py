@@ -5,8 +5,10 @@ A module for sanitizing log entries
 import os
 import re
 import logging
-import mysql.connector
-from typing import List
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import mysql.connector
 
 
 patterns = {
@@ -38,8 +40,10 @@ def get_logger() -> logging.Logger:
     return logger
 
 
-def get_db() -> mysql.connector.connection.MySQLConnection:
+def get_db() -> "mysql.connector.connection.MySQLConnection":
     """ establish connection to MySQL database """
+    # Imported here so that filter_datum and the logger work without it
+    import mysql.connector
     return mysql.connector.connect(
         host=os.getenv("PERSONAL_DATA_DB_HOST", "root"),
         database=os.getenv("PERSONAL_DATA_DB_NAME"),
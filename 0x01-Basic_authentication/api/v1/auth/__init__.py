@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Authentication backends of the API.
+
+Each backend is imported only when selected, so an app does not pay
+for the modules of the backends it does not use.
+"""
+import importlib
+
+# AUTH_TYPE value -> "module.Class" of the backend
+AUTH_BACKENDS = {
+    'auth': 'api.v1.auth.auth.Auth',
+    'basic_auth': 'api.v1.auth.basic_auth.BasicAuth',
+}
+
+
+def load_auth(auth_type: str):
+    """
+    Returns an instance of the backend registered as auth_type, or None
+    if there is none.
+    """
+    target = AUTH_BACKENDS.get(auth_type)
+    if target is None:
+        return None
+    module_name, _, class_name = target.rpartition('.')
+    return getattr(importlib.import_module(module_name), class_name)()
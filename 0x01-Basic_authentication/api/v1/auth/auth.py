@@ -41,3 +41,9 @@ class Auth:
         Gets the current user from the request.
         """
         return None
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the authentication system.
+        """
+        return {}
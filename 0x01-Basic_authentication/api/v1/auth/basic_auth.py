@@ -7,6 +7,7 @@ import base64
 import binascii
 from typing import Tuple, TypeVar
 from .auth import Auth
+from api.v1.metrics import span
 from models.user import User
 
 
@@ -66,12 +67,15 @@ class BasicAuth(Auth):
         """
         if type(user_email) == str and type(user_pwd) == str:
             try:
-                users = User.search({'email': user_email})
+                with span('store_lookup'):
+                    users = User.search({'email': user_email})
             except Exception:
                 return None
             if len(users) <= 0:
                 return None
-            if users[0].is_valid_password(user_pwd):
+            with span('password_hash'):
+                is_valid = users[0].is_valid_password(user_pwd)
+            if is_valid:
                 return users[0]
         return None
 
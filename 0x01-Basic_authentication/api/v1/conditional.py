@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Conditional requests (ETag, If-None-Match, If-Match) for the API
+"""
+import hashlib
+from flask import Response, current_app, request
+from werkzeug.http import parse_etags
+
+# Query parameters that change the body of a representation
+VARIANT_ARGS = ('compact', 'fields')
+# Suffixes added to strong ETags by api.v1.encoding.compress
+ENCODING_SUFFIXES = ('-gzip', '-deflate')
+
+
+def representation_etag(version: str) -> str:
+    """
+    Returns the ETag of the requested representation of a resource,
+    combining its version with the query parameters that change the body.
+    """
+    variant = [(name, request.args.get(name)) for name in VARIANT_ARGS
+               if name in request.args]
+    if len(variant) == 0:
+        return version
+    raw = "{}?{}".format(version, variant)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _strip_suffix(tag: str) -> str:
+    """
+    Removes the content-coding suffix of a tag.
+    """
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def _matches(header: str, etag: str, strong: bool) -> bool:
+    """
+    Checks an If-Match or If-None-Match header against an ETag.
+    """
+    etags = parse_etags(header)
+    if etags.star_tag:
+        return True
+    tags = etags.as_set(include_weak=not strong)
+    return any(_strip_suffix(tag) == etag for tag in tags)
+
+
+def is_not_modified(etag: str) -> bool:
+    """
+    Returns True if If-None-Match holds the ETag (weak comparison).
+    """
+    header = request.headers.get('If-None-Match')
+    return header is not None and _matches(header, etag, strong=False)
+
+
+def is_precondition_failed(etag: str) -> bool:
+    """
+    Returns True if If-Match is present and does not hold the ETag
+    (strong comparison).
+    """
+    header = request.headers.get('If-Match')
+    return header is not None and not _matches(header, etag, strong=True)
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Returns an empty 304 response carrying the ETag.
+    """
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+""" Blueprint of the API views
+"""
+from flask import Blueprint
+from models.user import User
+
+app_views = Blueprint("app_views", __name__, url_prefix="/api/v1")
+
+from api.v1.views.index import *  # noqa: E402,F401,F403
+from api.v1.views.users import *  # noqa: E402,F401,F403
+
+User.load_from_file()
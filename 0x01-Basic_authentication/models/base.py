@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 """Base module.
 """
+import hashlib
+import itertools
 import json
+import os
+import threading
+import time
 import uuid
 from os import path
 from datetime import datetime
@@ -10,6 +15,50 @@ from typing import TypeVar, List, Iterable
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+# Collection versions: bumped on every change, with a per-process token
+# so that versions from before a restart or from another worker differ
+VERSIONS = {}
+PROCESS_TOKEN = uuid.uuid4().hex[:8]
+_version_counter = itertools.count(1)
+# Activity of each class, kept up to date by save, remove and save_to_file
+# so that reading it never scans DATA
+STATS = {}
+STATS_WINDOW_MINUTES = int(os.getenv('STATS_WINDOW_MINUTES', '60'))
+
+
+class SlidingWindow():
+    """Event counts per minute over the last few minutes.
+    """
+
+    def __init__(self, minutes: int = STATS_WINDOW_MINUTES):
+        """Initialize an empty window of `minutes` one-minute slots.
+        """
+        self.minutes = minutes
+        self._counts = [0] * minutes
+        self._minutes = [-1] * minutes
+        self._lock = threading.Lock()
+
+    def add(self, now: float = None):
+        """Counts one event at `now`, the current time by default.
+        """
+        minute = int((now or time.time()) // 60)
+        slot = minute % self.minutes
+        with self._lock:
+            if self._minutes[slot] != minute:
+                self._minutes[slot] = minute
+                self._counts[slot] = 0
+            self._counts[slot] += 1
+
+    def total(self, minutes: int = None, now: float = None) -> int:
+        """Number of events in the last `minutes` minutes, counting the
+        current one.
+        """
+        minutes = min(minutes or self.minutes, self.minutes)
+        current = int((now or time.time()) // 60)
+        with self._lock:
+            return sum(count for count, minute
+                       in zip(self._counts, self._minutes)
+                       if current - minutes < minute <= current)
 
 
 class Base():
@@ -44,11 +93,20 @@ class Base():
             return False
         return (self.id == other.id)
 
-    def to_json(self, for_serialization: bool = False) -> dict:
+    def to_json(self, for_serialization: bool = False,
+                fields: Iterable[str] = None) -> dict:
         """Convert the object a JSON dictionary.
+
+        If fields is given, only those attributes are converted.
         """
         result = {}
-        for key, value in self.__dict__.items():
+        attributes = self.__dict__
+        if fields is None:
+            items = attributes.items()
+        else:
+            items = [(key, attributes[key]) for key in fields
+                     if key in attributes]
+        for key, value in items:
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -57,20 +115,70 @@ class Base():
                 result[key] = value
         return result
 
+    def etag(self) -> str:
+        """Entity tag of the object, derived from its id and updated_at.
+        """
+        raw = "{}:{}".format(self.id, self.updated_at.isoformat())
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    @classmethod
+    def collection_version(cls) -> str:
+        """Version of the collection, changed by every save or remove.
+        """
+        return "{}-{}".format(PROCESS_TOKEN, VERSIONS.get(cls.__name__, 0))
+
+    @classmethod
+    def _bump_version(cls):
+        """Marks the collection as changed.
+        """
+        VERSIONS[cls.__name__] = next(_version_counter)
+
+    @classmethod
+    def _activity(cls) -> dict:
+        """Activity counters of the class.
+        """
+        activity = STATS.get(cls.__name__)
+        if activity is None:
+            activity = STATS.setdefault(cls.__name__, {
+                'created': SlidingWindow(),
+                'updated': SlidingWindow(),
+                'removed': SlidingWindow(),
+                'store_bytes': 0,
+            })
+        return activity
+
+    @classmethod
+    def stats(cls, minutes: int = None) -> dict:
+        """Objects created, updated and removed in the last `minutes`
+        minutes and size of the file store, without scanning the objects.
+        """
+        activity = cls._activity()
+        return {
+            'created': activity['created'].total(minutes),
+            'updated': activity['updated'].total(minutes),
+            'removed': activity['removed'].total(minutes),
+            'store_bytes': activity['store_bytes'],
+        }
+
     @classmethod
     def load_from_file(cls):
         """Load all objects from file.
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
         if not path.exists(file_path):
+            DATA[s_class] = {}
+            cls._bump_version()
             return
 
+        objs = {}
         with open(file_path, 'r') as f:
             objs_json = json.load(f)
             for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+                objs[obj_id] = cls(**obj_json)
+        DATA[s_class] = objs
+        cls._activity()['store_bytes'] = path.getsize(file_path)
+        cls._bump_version()
 
     @classmethod
     def save_to_file(cls):
@@ -82,15 +190,23 @@ class Base():
         for obj_id, obj in DATA[s_class].items():
             objs_json[obj_id] = obj.to_json(True)
 
-        with open(file_path, 'w') as f:
+        # Write then rename, so that readers never see a partial file
+        tmp_path = "{}.{}.{}.tmp".format(
+            file_path, os.getpid(), threading.get_ident())
+        with open(tmp_path, 'w') as f:
             json.dump(objs_json, f)
+        os.replace(tmp_path, file_path)
+        cls._activity()['store_bytes'] = path.getsize(file_path)
 
     def save(self):
         """Save current object.
         """
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
+        is_new = self.id not in DATA[s_class]
         DATA[s_class][self.id] = self
+        self.__class__._bump_version()
+        self.__class__._activity()['created' if is_new else 'updated'].add()
         self.__class__.save_to_file()
 
     def remove(self):
@@ -99,6 +215,8 @@ class Base():
         s_class = self.__class__.__name__
         if DATA[s_class].get(self.id) is not None:
             del DATA[s_class][self.id]
+            self.__class__._bump_version()
+            self.__class__._activity()['removed'].add()
             self.__class__.save_to_file()
 
     @classmethod
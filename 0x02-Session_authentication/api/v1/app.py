@@ -4,26 +4,26 @@ Route module for the API
 """
 from os import getenv
 from api.v1.views import app_views
-from flask import Flask, jsonify, abort, request
+from flask import Flask, abort, request
 from flask_cors import (CORS, cross_origin)
 import os
 
-from api.v1.auth.auth import Auth
-from api.v1.auth.basic_auth import BasicAuth
-from api.v1.auth.session_auth import SessionAuth
+from api.v1.encoding import compress, jsonify
+from api.v1.metrics import instrument, span
+from api.v1.profiling import PROFILER
+
+from api.v1.auth import load_auth
+from api.v1.auth.verify import VerifyMiddleware
 
 
 app = Flask(__name__)
+app.wsgi_app = VerifyMiddleware(app.wsgi_app, lambda: auth)
+instrument(app)
+PROFILER.attach(app)
+app.after_request(compress)
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
-auth = None
-auth_type = getenv('AUTH_TYPE', 'auth')
-if auth_type == 'auth':
-    auth = Auth()
-if auth_type == 'basic_auth':
-    auth = BasicAuth()
-if auth_type == 'session_auth':
-    auth = SessionAuth()
+auth = load_auth(getenv('AUTH_TYPE', 'auth'))
 
 
 @app.errorhandler(404)
@@ -57,10 +57,13 @@ def user_authentication():
             '/api/v1/status/',
             '/api/v1/unauthorized/',
             '/api/v1/forbidden/',
+            '/api/v1/metrics/',
             '/api/v1/auth_session/login/',
+            '/api/v1/auth_session/validate/',
         ]
         if auth.require_auth(request.path, excluded_paths):
-            user = auth.current_user(request)
+            with span('auth'):
+                user = auth.current_user(request)
             if auth.authorization_header(request) is None and \
                     auth.session_cookie(request) is None:
                 abort(401)
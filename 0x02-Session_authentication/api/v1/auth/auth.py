@@ -43,6 +43,12 @@ class Auth:
         """
         return None
 
+    def stats(self) -> dict:
+        """
+        Returns the counters of the authentication system.
+        """
+        return {}
+
     def session_cookie(self, request=None) -> str:
         """
         Returns a cookie value from a request
@@ -2,9 +2,11 @@
 """
 Session authentication module for the API.
 """
+import threading
 from uuid import uuid4
 from flask import request
 from .auth import Auth
+from api.v1.metrics import span
 from models.user import User
 
 
@@ -13,6 +15,9 @@ class SessionAuth(Auth):
     Session authentication class.
     """
     user_id_by_session_id = {}
+    session_ids_by_user_id = {}
+    lookups = {'hits': 0, 'misses': 0}
+    _lookups_lock = threading.Lock()
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -21,6 +26,8 @@ class SessionAuth(Auth):
         if type(user_id) is str:
             session_id = str(uuid4())
             self.user_id_by_session_id[session_id] = user_id
+            self.session_ids_by_user_id.setdefault(user_id, set()).add(
+                session_id)
             return session_id
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
@@ -28,14 +35,46 @@ class SessionAuth(Auth):
         Returns a User ID based on a Session ID
         """
         if type(session_id) is str:
-            return self.user_id_by_session_id.get(session_id)
+            user_id = self.lookup_session(session_id)
+            with self._lookups_lock:
+                self.lookups['misses' if user_id is None else 'hits'] += 1
+            return user_id
+
+    def lookup_session(self, session_id: str) -> str:
+        """
+        Returns the User ID stored for a Session ID
+        """
+        return self.user_id_by_session_id.get(session_id)
+
+    def lookup_stats(self) -> dict:
+        """
+        Returns the session lookup counters
+        """
+        with self._lookups_lock:
+            hits, misses = self.lookups['hits'], self.lookups['misses']
+        total = hits + misses
+        return {
+            'session_hits': hits,
+            'session_misses': misses,
+            'session_hit_rate': hits / total if total else 0.0,
+        }
+
+    def stats(self) -> dict:
+        """
+        Returns the active sessions and the session lookup counters
+        """
+        stats = self.lookup_stats()
+        stats['active_sessions'] = len(self.user_id_by_session_id)
+        stats['users_with_sessions'] = len(self.session_ids_by_user_id)
+        return stats
 
     def current_user(self, request=None) -> User:
         """
         Returns a User instance based on a cookie value
         """
         user_id = self.user_id_for_session_id(self.session_cookie(request))
-        return User.get(user_id)
+        with span('store_lookup'):
+            return User.get(user_id)
 
     def destroy_session(self, request=None):
         """
@@ -47,4 +86,20 @@ class SessionAuth(Auth):
             return False
         if session_id in self.user_id_by_session_id:
             del self.user_id_by_session_id[session_id]
+        session_ids = self.session_ids_by_user_id.get(user_id)
+        if session_ids is not None:
+            session_ids.discard(session_id)
+            if len(session_ids) == 0:
+                del self.session_ids_by_user_id[user_id]
+        return True
+
+    def revoke_sessions(self, user_id: str = None) -> bool:
+        """
+        Deletes every session of a user / logout everywhere.
+        """
+        if type(user_id) is not str:
+            return False
+        session_ids = self.session_ids_by_user_id.pop(user_id, set())
+        for session_id in session_ids:
+            self.user_id_by_session_id.pop(session_id, None)
         return True
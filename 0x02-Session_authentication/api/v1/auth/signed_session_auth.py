@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Stateless signed session authentication module for the API.
+"""
+import os
+import hmac
+import json
+import time
+import fcntl
+import base64
+import hashlib
+import binascii
+import threading
+from .session_auth import SessionAuth
+
+DEFAULT_SESSION_DURATION = 86400
+
+
+def _b64encode(data: bytes) -> str:
+    """
+    Encodes bytes as unpadded URL-safe Base64
+    """
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    """
+    Decodes unpadded URL-safe Base64
+    """
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _file_stamp(file_path: str) -> tuple:
+    """
+    Returns the modification time and size of a file, None if missing
+    """
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class SignedSessionAuth(SessionAuth):
+    """
+    Signed session authentication class.
+
+    The session ID is a token of the form ``<payload>.<signature>``
+    where the payload carries the user ID, the issue time, the expiry
+    and the user's session epoch. Validating it needs no session store,
+    only the shared ``SESSION_SECRET`` and the epochs of the users whose
+    sessions were revoked.
+
+    Revoking bumps the user's epoch in ``SESSION_EPOCH_FILE``, which
+    invalidates every token issued to that user so far, across restarts.
+    The file is rewritten atomically under an exclusive lock, and other
+    workers pick up changes within ``SESSION_EPOCH_CHECK_INTERVAL``
+    seconds, so validation costs at most one stat per interval.
+    """
+
+    def __init__(self):
+        """
+        Loads the signing key, the session duration and the epochs
+        """
+        secret = os.getenv('SESSION_SECRET')
+        if not secret:
+            raise ValueError("SESSION_SECRET must be set to sign sessions")
+        self.secret = secret.encode('utf-8')
+        try:
+            self.session_duration = int(os.getenv(
+                'SESSION_DURATION', DEFAULT_SESSION_DURATION))
+        except ValueError:
+            self.session_duration = DEFAULT_SESSION_DURATION
+        self.epoch_file = os.getenv(
+            'SESSION_EPOCH_FILE', '.db_session_epochs.json')
+        self.epoch_check_interval = float(os.getenv(
+            'SESSION_EPOCH_CHECK_INTERVAL', '1'))
+        self._epochs = {}
+        self._epochs_stamp = None
+        self._epochs_checked = 0.0
+        self._epochs_lock = threading.Lock()
+        self._refresh_epochs(force=True)
+
+    def _read_epochs(self) -> dict:
+        """
+        Returns the epochs saved in the epoch file
+        """
+        try:
+            with open(self.epoch_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _refresh_epochs(self, force: bool = False) -> None:
+        """
+        Reloads the epochs if the file changed since the last check, at
+        most once per check interval unless forced
+        """
+        now = time.monotonic()
+        if not force and now - self._epochs_checked < \
+                self.epoch_check_interval:
+            return
+        self._epochs_checked = now
+        stamp = _file_stamp(self.epoch_file)
+        if stamp != self._epochs_stamp:
+            # The file is only ever replaced whole, never partly written
+            self._epochs = self._read_epochs()
+            self._epochs_stamp = stamp
+
+    def _sign(self, payload: str) -> str:
+        """
+        Returns the signature of a payload
+        """
+        digest = hmac.new(
+            self.secret, payload.encode('ascii'), hashlib.sha256).digest()
+        return _b64encode(digest[:16])
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        Creates a signed session token for a user_id
+        """
+        if type(user_id) is not str or '|' in user_id:
+            return None
+        self._refresh_epochs()
+        issued_at = int(time.time())
+        expires_at = 0
+        if self.session_duration > 0:
+            expires_at = issued_at + self.session_duration
+        payload = _b64encode('{}|{}|{}|{}'.format(
+            user_id, issued_at, expires_at,
+            self._epochs.get(user_id, 0)).encode('utf-8'))
+        return '{}.{}'.format(payload, self._sign(payload))
+
+    def lookup_session(self, session_id: str) -> str:
+        """
+        Returns the User ID of a valid signed session token
+        """
+        payload, _, signature = session_id.partition('.')
+        if not payload or not signature:
+            return None
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        try:
+            fields = _b64decode(payload).decode('utf-8').split('|')
+            user_id = fields[0]
+            expires_at, epoch = int(fields[2]), int(fields[3])
+        except (binascii.Error, UnicodeDecodeError, IndexError, ValueError):
+            return None
+        if expires_at and expires_at < time.time():
+            return None
+        self._refresh_epochs()
+        if epoch != self._epochs.get(user_id, 0):
+            return None
+        return user_id
+
+    def stats(self) -> dict:
+        """
+        Returns the session lookup counters; tokens are not stored, so
+        only the users with revoked sessions are counted
+        """
+        stats = self.lookup_stats()
+        stats['users_with_revoked_sessions'] = len(self._epochs)
+        return stats
+
+    def revoke_sessions(self, user_id: str = None) -> bool:
+        """
+        Invalidates every session token issued to a user
+        """
+        if type(user_id) is not str:
+            return False
+        tmp_path = "{}.{}.tmp".format(self.epoch_file, os.getpid())
+        with self._epochs_lock, open(self.epoch_file + '.lock', 'a') as lock:
+            # Read, bump and replace under a lock shared by all workers,
+            # so that concurrent revocations are never lost
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            epochs = self._read_epochs()
+            epochs[user_id] = epochs.get(user_id, 0) + 1
+            with open(tmp_path, 'w') as f:
+                json.dump(epochs, f)
+            os.replace(tmp_path, self.epoch_file)
+            self._epochs = epochs
+            self._epochs_stamp = _file_stamp(self.epoch_file)
+        return True
+
+    def destroy_session(self, request=None):
+        """
+        Deletes the user session / logout.
+
+        A signed token cannot be withdrawn on its own, so logging out
+        revokes all of the user's sessions.
+        """
+        session_id = self.session_cookie(request)
+        user_id = self.user_id_for_session_id(session_id)
+        if (request is None or session_id is None) or user_id is None:
+            return False
+        return self.revoke_sessions(user_id)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Auth verification endpoint for reverse-proxy subrequests.
+"""
+import os
+from typing import Callable
+from werkzeug.wrappers import Request
+
+from api.v1.metrics import span
+
+VERIFY_PATH = '/api/v1/auth/verify'
+
+
+class VerifyMiddleware:
+    """
+    WSGI middleware answering GET /api/v1/auth/verify before Flask
+    routing, for nginx auth_request and envoy ext_authz.
+
+    The configured Auth checks the request's credentials. The answer has
+    no body: 200 with X-User-Id, 401 without credentials, 403 with
+    invalid ones, 503 if no Auth is configured. Grants may be cached by
+    the proxy, shared caches included, for AUTH_VERIFY_MAX_AGE seconds,
+    keyed on the credential headers.
+    """
+    def __init__(self, wsgi_app, get_auth: Callable) -> None:
+        """
+        Wraps a WSGI app; get_auth returns the configured Auth or None.
+        """
+        self.wsgi_app = wsgi_app
+        self.get_auth = get_auth
+        self.max_age = int(os.getenv('AUTH_VERIFY_MAX_AGE', '5'))
+
+    def __call__(self, environ: dict, start_response: Callable):
+        """
+        Answers verify requests, passes everything else to the app.
+        """
+        if environ.get('PATH_INFO', '').rstrip('/') != VERIFY_PATH:
+            return self.wsgi_app(environ, start_response)
+        environ['metrics.route'] = VERIFY_PATH
+        if environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self.respond(start_response, '405 Method Not Allowed',
+                                [('Allow', 'GET, HEAD')])
+        auth = self.get_auth()
+        if auth is None:
+            # Unknown AUTH_TYPE: fail closed rather than grant everything
+            return self.respond(start_response, '503 Service Unavailable',
+                                [])
+        request = Request(environ)
+        session_cookie = getattr(auth, 'session_cookie', None)
+        if auth.authorization_header(request) is None and \
+                (session_cookie is None or session_cookie(request) is None):
+            return self.respond(start_response, '401 Unauthorized', [])
+        with span('auth'):
+            user = auth.current_user(request)
+        if user is None:
+            return self.respond(start_response, '403 Forbidden', [])
+        return self.respond(start_response, '200 OK', [
+            ('X-User-Id', user.id),
+            ('Cache-Control', 'max-age={}'.format(self.max_age)),
+        ])
+
+    @staticmethod
+    def respond(start_response: Callable, status: str, headers: list):
+        """
+        Sends an empty response; only grants are cacheable, per
+        credential headers.
+        """
+        if not status.startswith('200'):
+            headers.append(('Cache-Control', 'no-store'))
+        headers += [('Vary', 'Authorization, Cookie'),
+                    ('Content-Length', '0')]
+        start_response(status, headers)
+        return [b'']
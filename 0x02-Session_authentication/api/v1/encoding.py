@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+JSON encoding and response compression for the API
+"""
+import gzip
+import json
+import os
+import zlib
+from flask import Response, current_app, has_request_context, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '1'))
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html')
+
+
+def _stdlib_dumps(obj) -> bytes:
+    """
+    Encodes with the standard library, without whitespace.
+    """
+    return json.dumps(obj, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+ENCODERS = {'json': _stdlib_dumps}
+if orjson is not None:
+    ENCODERS['orjson'] = orjson.dumps
+dumps = _stdlib_dumps
+
+
+def set_encoder(name: str = None) -> str:
+    """
+    Selects the JSON encoder by name, or the fastest one installed.
+    """
+    global dumps
+    if name not in ENCODERS:
+        name = 'orjson' if 'orjson' in ENCODERS else 'json'
+    dumps = ENCODERS[name]
+    return name
+
+
+set_encoder(os.getenv('API_JSON_ENCODER'))
+
+
+def _without_nulls(data):
+    """
+    Drops the None fields of an object or of a list of objects.
+    """
+    if isinstance(data, dict):
+        return {k: v for k, v in data.items() if v is not None}
+    if isinstance(data, list):
+        return [_without_nulls(item) for item in data]
+    return data
+
+
+def jsonify(*args, **kwargs) -> Response:
+    """
+    Drop-in replacement of flask.jsonify using the selected encoder.
+
+    With ?compact=1 in the query string, None fields are left out.
+    """
+    if args and kwargs:
+        raise TypeError("jsonify() behavior undefined when passed both "
+                        "args and kwargs")
+    if len(args) == 1:
+        data = args[0]
+    else:
+        data = list(args) or kwargs
+    if has_request_context() and \
+            request.args.get('compact', '').lower() in ('1', 'true', 'yes'):
+        data = _without_nulls(data)
+    return current_app.response_class(dumps(data) + b'\n',
+                                      mimetype='application/json')
+
+
+def compress(response: Response) -> Response:
+    """
+    after_request hook compressing large responses with gzip or deflate,
+    whichever the client accepts with the higher quality.
+    """
+    if response.status_code != 200 or response.direct_passthrough or \
+            'Content-Encoding' in response.headers or \
+            response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    coding = request.accept_encodings.best_match(('gzip', 'deflate'))
+    if coding == 'gzip':
+        response.set_data(gzip.compress(data, COMPRESS_LEVEL, mtime=0))
+    elif coding == 'deflate':
+        response.set_data(zlib.compress(data, COMPRESS_LEVEL))
+    else:
+        return response
+    response.headers['Content-Encoding'] = coding
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        # A strong ETag names exact bytes, so tell the encodings apart
+        response.set_etag('{}-{}'.format(etag, coding))
+    return response
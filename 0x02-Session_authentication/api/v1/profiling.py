@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Sampling request profiler
+
+A fraction of requests run under cProfile, covering the before_request
+functions and the view. Results are aggregated per route, for a bounded
+number of routes, and dumped on demand as a pstats file or as text.
+"""
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+from collections import OrderedDict
+from typing import Union
+
+
+class Profiler:
+    """Profiles a sample of requests with cProfile, per route.
+
+    ``PROFILE_SAMPLE_RATE`` is the fraction of requests profiled and
+    ``PROFILE_MAX_ROUTES`` how many routes keep results, least recently
+    profiled first out. Only one request is profiled at a time; others
+    run unprofiled rather than wait. With a rate of 0 the attached apps
+    run unwrapped, so a disabled profiler costs nothing.
+
+    Controlling the profiler takes the admin token ``PROFILER_TOKEN``,
+    sent in the ``X-Profiler-Token`` header; without it set, the
+    profiler can only be configured through the environment.
+    """
+
+    def __init__(self, rate: float = None, max_routes: int = None,
+                 token: str = None) -> None:
+        """Initializes the profiler, defaulting to the environment settings.
+        """
+        if token is None:
+            token = os.getenv('PROFILER_TOKEN', '')
+        self.token = token
+        if rate is None:
+            rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+        if max_routes is None:
+            max_routes = int(os.getenv('PROFILE_MAX_ROUTES', '50'))
+        self.rate = 0.0
+        self.max_routes = max(1, max_routes)
+        self._apps = []
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = OrderedDict()
+        self.set_rate(rate)
+
+    def authorized(self, token: str) -> bool:
+        """Tells whether a request token is the admin token.
+        """
+        if not self.token or not token:
+            return False
+        return hmac.compare_digest(token.encode(), self.token.encode())
+
+    def attach(self, app) -> None:
+        """Makes a Flask app profile its requests while the rate is set.
+        """
+        from flask import request
+        dispatch = app.full_dispatch_request
+
+        def profiled_dispatch():
+            if random.random() >= self.rate or \
+                    not self._busy.acquire(blocking=False):
+                return dispatch()
+            rule = request.url_rule
+            route = '{} {}'.format(
+                request.method,
+                rule.rule if rule is not None else '<unmatched>')
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active in this process
+                self._busy.release()
+                return dispatch()
+            try:
+                return dispatch()
+            finally:
+                profile.disable()
+                self._busy.release()
+                self._record(route, profile)
+
+        self._apps.append((app, dispatch, profiled_dispatch))
+        self._install(app, dispatch, profiled_dispatch)
+
+    def _install(self, app, dispatch, profiled_dispatch) -> None:
+        """Wraps or unwraps an app's dispatch according to the rate.
+        """
+        if self.rate > 0:
+            app.full_dispatch_request = profiled_dispatch
+        else:
+            app.full_dispatch_request = dispatch
+
+    def set_rate(self, rate: float) -> None:
+        """Sets the sampled fraction of requests; 0 disables profiling.
+        """
+        self.rate = min(1.0, max(0.0, float(rate)))
+        for app in self._apps:
+            self._install(*app)
+
+    def _record(self, route: str, profile: cProfile.Profile) -> None:
+        """Adds a request's profile to its route's results.
+        """
+        with self._lock:
+            entry = self._stats.pop(route, None)
+            if entry is None:
+                entry = [0, pstats.Stats(profile)]
+            else:
+                entry[1].add(profile)
+            entry[0] += 1
+            self._stats[route] = entry
+            while len(self._stats) > self.max_routes:
+                self._stats.popitem(last=False)
+
+    def summary(self) -> dict:
+        """Returns the rate and the number of samples per route.
+        """
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "max_routes": self.max_routes,
+                "routes": {route: entry[0]
+                           for route, entry in self._stats.items()},
+            }
+
+    def dump(self, route: str = None, fmt: str = 'pstats',
+             limit: int = 40) -> Union[bytes, str, None]:
+        """Returns the results of one route, or of all routes merged.
+
+        Args:
+            route (str): "METHOD /rule" as listed by summary().
+            fmt (str): 'pstats' for the binary format read by
+                pstats.Stats and snakeviz, 'text' for a listing sorted
+                by cumulative time.
+            limit (int): How many functions the text listing shows.
+
+        Returns:
+            The results, or None if there are none.
+        """
+        stream = io.StringIO()
+        merged = pstats.Stats(stream=stream)
+        with self._lock:
+            entries = [entry for name, entry in self._stats.items()
+                       if route is None or name == route]
+            for _, stats in entries:
+                merged.add(stats)
+        if not entries:
+            return None
+        if fmt == 'text':
+            merged.sort_stats('cumulative').print_stats(limit)
+            return stream.getvalue()
+        return marshal.dumps(merged.stats)
+
+    def reset(self) -> None:
+        """Drops every result.
+        """
+        with self._lock:
+            self._stats.clear()
+
+
+PROFILER = Profiler()
@@ -2,8 +2,11 @@
 """
 Module of Index views
 """
-from flask import jsonify, abort
+from flask import abort, request
+from api.v1.encoding import jsonify
 from api.v1.views import app_views
+from models.base import STATS_WINDOW_MINUTES
+from models.user import User
 
 
 @app_views.route('/status', methods=['GET'], strict_slashes=False)
@@ -18,15 +21,120 @@ def status() -> str:
 @app_views.route('/stats/', strict_slashes=False)
 def stats() -> str:
     """GET /api/v1/stats
+    Query parameter:
+      - minutes (optional): activity window, STATS_WINDOW_MINUTES at most.
     Return:
-      - the number of each objects.
+      - the number of each objects, the users created, updated and
+        removed in the last minutes, the size of the store and the
+        counters of the authentication system.
     """
-    from models.user import User
+    try:
+        minutes = int(request.args.get('minutes', STATS_WINDOW_MINUTES))
+    except ValueError:
+        return jsonify({'error': "minutes must be an integer"}), 400
+    minutes = max(1, min(minutes, STATS_WINDOW_MINUTES))
     stats = {}
     stats['users'] = User.count()
+    stats['minutes'] = minutes
+    for key, value in User.stats(minutes).items():
+        stats['users_' + key] = value
+    from api.v1.app import auth
+    if auth is not None:
+        stats.update(auth.stats())
     return jsonify(stats)
 
 
+@app_views.route('/metrics', methods=['GET'], strict_slashes=False)
+def metrics() -> str:
+    """GET /api/v1/metrics
+    Return:
+      - request counters and latency histograms in the Prometheus text
+        format.
+    """
+    from api.v1.metrics import CONTENT_TYPE, REGISTRY
+    return REGISTRY.render(), 200, {'Content-Type': CONTENT_TYPE}
+
+
+def require_profiler_admin() -> None:
+    """Aborts with 403 unless the request carries the profiler admin
+    token in X-Profiler-Token.
+    """
+    from api.v1.profiling import PROFILER
+    if not PROFILER.authorized(request.headers.get('X-Profiler-Token')):
+        abort(403)
+
+
+@app_views.route('/profiler', methods=['GET'], strict_slashes=False)
+def profiler() -> str:
+    """GET /api/v1/profiler
+    Return:
+      - the sample rate and the number of profiled requests per route.
+      - 403 without the profiler admin token.
+    """
+    require_profiler_admin()
+    from api.v1.profiling import PROFILER
+    return jsonify(PROFILER.summary())
+
+
+@app_views.route('/profiler', methods=['PUT'], strict_slashes=False)
+def set_profiler_rate() -> str:
+    """PUT /api/v1/profiler
+    JSON body:
+      - rate: fraction of requests to profile, 0 to disable.
+    Return:
+      - the profiler summary once the sample rate is set.
+      - 400 if the rate is missing or not a number.
+      - 403 without the profiler admin token.
+    """
+    require_profiler_admin()
+    from api.v1.profiling import PROFILER
+    rj = request.get_json(silent=True)
+    try:
+        PROFILER.set_rate(rj.get('rate'))
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'error': "rate must be a number"}), 400
+    return jsonify(PROFILER.summary())
+
+
+@app_views.route('/profiler', methods=['DELETE'], strict_slashes=False)
+def reset_profiler() -> str:
+    """DELETE /api/v1/profiler
+    Return:
+      - the profiler summary once the results are dropped.
+      - 403 without the profiler admin token.
+    """
+    require_profiler_admin()
+    from api.v1.profiling import PROFILER
+    PROFILER.reset()
+    return jsonify(PROFILER.summary())
+
+
+@app_views.route('/profiler/dump', methods=['GET'], strict_slashes=False)
+def dump_profiler() -> str:
+    """GET /api/v1/profiler/dump
+    Query parameters:
+      - route (optional): "METHOD /rule" as listed by GET /profiler.
+      - format (optional): pstats (default) or text.
+    Return:
+      - the profile of the route, or of all routes, as a pstats file
+        or as text.
+      - 403 without the profiler admin token.
+      - 404 if nothing was profiled.
+    """
+    require_profiler_admin()
+    from api.v1.profiling import PROFILER
+    fmt = request.args.get('format', 'pstats')
+    result = PROFILER.dump(request.args.get('route'), fmt)
+    if result is None:
+        abort(404)
+    if fmt == 'text':
+        return result, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    return result, 200, {
+        'Content-Type': 'application/octet-stream',
+        'Content-Disposition': 'attachment; filename=profile.pstats',
+    }
+
+
 @app_views.route('/unauthorized/', strict_slashes=False)
 def unauthorized() -> None:
     """GET /api/v1/unauthorized
@@ -2,13 +2,20 @@
 """
 Module of session authenticating views
 """
+import hmac
 import os
 from typing import Tuple
-from flask import abort, jsonify, request
+from flask import abort, request
 
 from models.user import User
+from api.v1.encoding import jsonify
+from api.v1.metrics import span
 from api.v1.views import app_views
 
+SESSION_VALIDATE_MAX_BATCH = int(os.getenv('SESSION_VALIDATE_MAX_BATCH',
+                                           '1000'))
+SESSION_VALIDATE_TOKEN = os.getenv('SESSION_VALIDATE_TOKEN', '')
+
 
 @app_views.route('/auth_session/login', methods=['POST'], strict_slashes=False)
 def login() -> Tuple[str, int]:
@@ -24,12 +31,15 @@ def login() -> Tuple[str, int]:
     if password is None or len(password.strip()) == 0:
         return jsonify({"error": "password missing"}), 400
     try:
-        users = User.search({'email': email})
+        with span('store_lookup'):
+            users = User.search({'email': email})
     except Exception:
         return jsonify(not_found_res), 404
     if len(users) <= 0:
         return jsonify(not_found_res), 404
-    if users[0].is_valid_password(password):
+    with span('password_hash'):
+        is_valid = users[0].is_valid_password(password)
+    if is_valid:
         from api.v1.app import auth
         sessiond_id = auth.create_session(getattr(users[0], 'id'))
         res = jsonify(users[0].to_json())
@@ -37,6 +47,7 @@ def login() -> Tuple[str, int]:
         return res
     return jsonify({"error": "wrong password"}), 401
 
+
 @app_views.route(
     '/auth_session/logout', methods=['DELETE'], strict_slashes=False)
 def logout() -> Tuple[str, int]:
@@ -49,3 +60,66 @@ def logout() -> Tuple[str, int]:
     if not is_destroyed:
         abort(404)
     return jsonify({})
+
+
+@app_views.route(
+    '/auth_session/validate', methods=['POST'], strict_slashes=False)
+def validate_sessions() -> Tuple[str, int]:
+    """POST /api/v1/auth_session/validate
+    Header:
+      - X-Gateway-Token: the shared SESSION_VALIDATE_TOKEN.
+    JSON body:
+      - List of Session IDs, at most SESSION_VALIDATE_MAX_BATCH.
+    Return:
+      - List of the matching User IDs, in the same order, null for
+        unknown or expired sessions.
+      - 400 if the body isn't a list of strings.
+      - 403 without the gateway token, or if none is configured.
+      - 404 if the auth backend has no sessions.
+      - 413 if the list is over the batch size.
+    """
+    token = request.headers.get('X-Gateway-Token', '')
+    if not SESSION_VALIDATE_TOKEN or not hmac.compare_digest(
+            token.encode(), SESSION_VALIDATE_TOKEN.encode()):
+        abort(403)
+    session_ids = request.get_json(silent=True)
+    if type(session_ids) is not list or \
+            any(type(s) is not str for s in session_ids):
+        return jsonify({"error": "expected a list of session ids"}), 400
+    if len(session_ids) > SESSION_VALIDATE_MAX_BATCH:
+        return jsonify({"error": "at most {} session ids".format(
+            SESSION_VALIDATE_MAX_BATCH)}), 413
+    from api.v1.app import auth
+    lookup = getattr(auth, 'user_id_for_session_id', None)
+    if lookup is None:
+        abort(404)
+    with span('auth'):
+        user_ids = [lookup(session_id) for session_id in session_ids]
+    return jsonify(user_ids)
+
+
+@app_views.route(
+    '/users/<user_id>/sessions', methods=['DELETE'], strict_slashes=False)
+def revoke_user_sessions(user_id: str = None) -> Tuple[str, int]:
+    """DELETE /api/v1/users/:id/sessions
+    Path parameter:
+      - User ID: "me" or the authenticated User's own ID.
+    Return:
+      - An empty JSON object once every session of the User is deleted.
+      - 403 if the User ID isn't the authenticated User's.
+      - 404 if the User no longer exists.
+    """
+    current_user = getattr(request, 'current_user', None)
+    if current_user is None:
+        abort(403)
+    if user_id == 'me':
+        user_id = current_user.id
+    if user_id != current_user.id:
+        abort(403)
+    if User.get(user_id) is None:
+        abort(404)
+    from api.v1.app import auth
+    if not hasattr(auth, 'revoke_sessions'):
+        abort(404)
+    auth.revoke_sessions(user_id)
+    return jsonify({})
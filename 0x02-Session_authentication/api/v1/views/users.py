@@ -3,18 +3,55 @@
 Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from api.v1.metrics import span
+import threading
+from api.v1.conditional import (is_not_modified, is_precondition_failed,
+                                not_modified, representation_etag)
+from api.v1.encoding import jsonify
+from flask import abort, request
 from models.user import User
 
+_update_lock = threading.Lock()
+
+
+def _requested_fields() -> list:
+    """Returns the attributes listed in ?fields=, or None for all.
+    """
+    fields = [field.strip()
+              for field in request.args.get('fields', '').split(',')
+              if field.strip()]
+    return fields or None
+
+
+def _user_response(user: User) -> str:
+    """Returns a User JSON represented with its ETag, or 304 if the
+    client already holds it.
+    """
+    etag = representation_etag(user.etag())
+    if is_not_modified(etag):
+        return not_modified(etag)
+    response = jsonify(user.to_json(fields=_requested_fields()))
+    response.set_etag(etag)
+    return response
+
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """GET /api/v1/users
+    Query parameter:
+      - fields (optional): comma separated attributes to return.
     Return:
       - list of all User objects JSON represented.
+      - 304 if If-None-Match holds the current ETag.
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    etag = representation_etag(User.collection_version())
+    if is_not_modified(etag):
+        return not_modified(etag)
+    fields = _requested_fields()
+    all_users = [user.to_json(fields=fields) for user in User.all()]
+    response = jsonify(all_users)
+    response.set_etag(etag)
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -22,8 +59,11 @@ def view_one_user(user_id: str = None) -> str:
     """GET /api/v1/users/:id
     Path parameter:
       - User ID.
+    Query parameter:
+      - fields (optional): comma separated attributes to return.
     Return:
       - User object JSON represented.
+      - 304 if If-None-Match holds the current ETag.
       - 404 if the User ID doesn't exist.
     """
     if user_id is None:
@@ -32,11 +72,11 @@ def view_one_user(user_id: str = None) -> str:
         if request.current_user is None:
             abort(404)
         else:
-            return jsonify(request.current_user.to_json())
+            return _user_response(request.current_user)
     user = User.get(user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_json())
+    return _user_response(user)
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -53,7 +93,11 @@ def delete_user(user_id: str = None) -> str:
     user = User.get(user_id)
     if user is None:
         abort(404)
-    user.remove()
+    with span('store_write'):
+        user.remove()
+    from api.v1.app import auth
+    if hasattr(auth, 'revoke_sessions'):
+        auth.revoke_sessions(user_id)
     return jsonify({}), 200
 
 
@@ -88,7 +132,8 @@ def create_user() -> str:
             user.password = rj.get("password")
             user.first_name = rj.get("first_name")
             user.last_name = rj.get("last_name")
-            user.save()
+            with span('store_write'):
+                user.save()
             return jsonify(user.to_json()), 201
         except Exception as e:
             error_msg = "Can't create User: {}".format(e)
@@ -107,6 +152,7 @@ def update_user(user_id: str = None) -> str:
       - User object JSON represented.
       - 404 if the User ID doesn't exist.
       - 400 if can't update the User.
+      - 412 if If-Match doesn't hold the current ETag.
     """
     if user_id is None:
         abort(404)
@@ -118,11 +164,18 @@ def update_user(user_id: str = None) -> str:
         rj = request.get_json()
     except Exception as e:
         rj = None
-    if rj is None:
-        return jsonify({'error': "Wrong format"}), 400
-    if rj.get('first_name') is not None:
-        user.first_name = rj.get('first_name')
-    if rj.get('last_name') is not None:
-        user.last_name = rj.get('last_name')
-    user.save()
-    return jsonify(user.to_json()), 200
+    with _update_lock:
+        if is_precondition_failed(representation_etag(user.etag())):
+            return jsonify({'error': "Precondition failed"}), 412
+        if rj is None:
+            return jsonify({'error': "Wrong format"}), 400
+        if rj.get('first_name') is not None:
+            user.first_name = rj.get('first_name')
+        if rj.get('last_name') is not None:
+            user.last_name = rj.get('last_name')
+        with span('store_write'):
+            user.save()
+        etag = representation_etag(user.etag())
+    response = jsonify(user.to_json())
+    response.set_etag(etag)
+    return response, 200
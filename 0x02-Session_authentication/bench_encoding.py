@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Encoding and compression cost of GET /api/v1/users
+
+Usage: ./bench_encoding.py [users] [repeat]
+
+Fills the User store with `users` users and times the listing through
+the Flask test client: flask.jsonify as before, then each installed
+encoder, with and without ?compact=1 and with each Content-Encoding.
+Reports the best latency, the CPU time per request and per kB sent.
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODELS = os.path.join(os.path.dirname(HERE), "0x01-Basic_authentication")
+
+
+def measure(client, url: str, coding: str, repeat: int) -> tuple:
+    """
+    Fetches a URL `repeat` times.
+
+    Returns:
+        tuple: The best latency and CPU time in seconds, and the bytes
+            sent.
+    """
+    best_wall = best_cpu = float('inf')
+    size = 0
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        response = client.get(url, headers={'Accept-Encoding': coding})
+        best_wall = min(best_wall, time.perf_counter() - wall)
+        best_cpu = min(best_cpu, time.process_time() - cpu)
+        size = len(response.data)
+    return best_wall, best_cpu, size
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    sys.path[:0] = [HERE, MODELS]
+    os.environ.setdefault('AUTH_TYPE', 'none')
+    os.chdir(tempfile.mkdtemp())
+    import flask
+    from api.v1 import encoding
+    from api.v1.app import app
+    from models.base import DATA
+    from models.user import User
+    for i in range(users):
+        user = User(id=str(uuid.uuid4()))
+        user.email = "user{}@holberton.io".format(i)
+        user.password = "pwd"
+        user.first_name = "Bob" if i % 2 else None
+        DATA['User'][user.id] = user
+
+    @app.route('/bench/flask_jsonify')
+    def flask_jsonify() -> str:
+        return flask.jsonify([user.to_json() for user in User.all()])
+
+    client = app.test_client()
+    print("{:<26} {:>9} {:>9} {:>11} {:>9}".format(
+        "variant", "wall ms", "cpu ms", "bytes", "cpu ns/kB"))
+    variants = [("flask.jsonify", '/bench/flask_jsonify', 'json', 'identity')]
+    for name in encoding.ENCODERS:
+        for query in ('', '?compact=1'):
+            for coding in ('identity', 'deflate', 'gzip'):
+                variants.append(("{}{} {}".format(
+                    name, ' compact' if query else '', coding),
+                    '/api/v1/users' + query, name, coding))
+    for label, url, encoder, coding in variants:
+        encoding.set_encoder(encoder)
+        wall, cpu, size = measure(client, url, coding, repeat)
+        print("{:<26} {:9.1f} {:9.1f} {:11,} {:9.0f}".format(
+            label, wall * 1e3, cpu * 1e3, size, cpu * 1e9 / (size / 1e3)))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Serialization cost of GET /api/v1/users with ?fields= projections
+
+Usage: ./bench_projection.py [users] [repeat]
+
+Fills the User store with `users` users, then for each projection times
+the to_json() calls alone and the whole listing through the Flask test
+client, keeping the best of `repeat` runs.
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODELS = os.path.join(os.path.dirname(HERE), "0x01-Basic_authentication")
+PROJECTIONS = (None, "id,email,first_name,last_name", "id,email", "id")
+
+
+def best(fn, repeat: int) -> float:
+    """Returns the best wall time of `repeat` calls, in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    sys.path[:0] = [HERE, MODELS]
+    os.environ.setdefault('AUTH_TYPE', 'none')
+    os.chdir(tempfile.mkdtemp())
+    from api.v1.app import app
+    from models.base import DATA
+    from models.user import User
+    for i in range(users):
+        user = User(id=str(uuid.uuid4()))
+        user.email = "user{}@holberton.io".format(i)
+        user.password = "pwd"
+        DATA['User'][user.id] = user
+
+    client = app.test_client()
+    print("{:<32} {:>12} {:>12} {:>12}".format(
+        "fields", "to_json ms", "GET ms", "bytes"))
+    for fields in PROJECTIONS:
+        names = fields.split(',') if fields else None
+        serialize = best(lambda: [u.to_json(fields=names)
+                                  for u in User.all()], repeat)
+        url = '/api/v1/users' + ('?fields=' + fields if fields else '')
+        size = len(client.get(url).data)
+        listing = best(lambda: client.get(url), repeat)
+        print("{:<32} {:12.1f} {:12.1f} {:12,}".format(
+            fields or "(all)", serialize * 1e3, listing * 1e3, size))
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Throughput comparison of the session authentication backends
+"""
+import os
+import sys
+import timeit
+import uuid
+
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.signed_session_auth import SignedSessionAuth
+
+
+def bench(auth, n_users: int, n_lookups: int) -> dict:
+    """
+    Creates one session per user then validates them in a loop.
+
+    Returns:
+        dict: The creation and validation rates in operations/sec.
+    """
+    user_ids = [str(uuid.uuid4()) for _ in range(n_users)]
+    elapsed = timeit.timeit(
+        lambda: [auth.create_session(uid) for uid in user_ids], number=1)
+    create_rate = n_users / elapsed
+    session_ids = [auth.create_session(uid) for uid in user_ids]
+    sample = [session_ids[i % n_users] for i in range(n_lookups)]
+    elapsed = timeit.timeit(
+        lambda: [auth.user_id_for_session_id(s) for s in sample], number=1)
+    return {
+        'create/s': create_rate,
+        'validate/s': n_lookups / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SESSION_SECRET', 'bench-secret')
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n_lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    for backend in (SessionAuth, SignedSessionAuth):
+        rates = bench(backend(), n_users, n_lookups)
+        print("{:<20} create {:>12,.0f}/s  validate {:>12,.0f}/s".format(
+            backend.__name__, rates['create/s'], rates['validate/s']))
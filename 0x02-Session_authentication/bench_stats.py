@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Latency of GET /api/v1/stats as the User store grows
+
+Usage: ./bench_stats.py [max_users] [requests]
+
+Grows the User store tenfold at each step, up to `max_users` users, and
+times GET /api/v1/stats through the Flask test client at each size,
+keeping the median of `requests` calls. The activity counters are read
+without scanning the store, so the latency should not grow with it.
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODELS = os.path.join(os.path.dirname(HERE), "0x01-Basic_authentication")
+
+
+def median_latency(client, url: str, requests: int) -> float:
+    """Returns the median latency of `requests` calls, in microseconds.
+    """
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append((time.perf_counter() - start) * 1e6)
+        assert response.status_code == 200, response.status
+    return sorted(samples)[len(samples) // 2]
+
+
+if __name__ == "__main__":
+    max_users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    sys.path[:0] = [HERE, MODELS]
+    os.environ.update(AUTH_TYPE='session_auth', SESSION_NAME='_my_session_id')
+    os.chdir(tempfile.mkdtemp())
+    from api.v1.app import app, auth
+    from models.base import DATA
+    from models.user import User
+    user = User(email="bench@holberton.io")
+    user.save()
+    client = app.test_client()
+    client.set_cookie('_my_session_id', auth.create_session(user.id))
+
+    size = 1
+    while size <= max_users:
+        for i in range(User.count(), size):
+            other = User(id=str(uuid.uuid4()))
+            other.email = "user{}@holberton.io".format(i)
+            DATA['User'][other.id] = other
+        print("{:>9,} users  /stats p50 {:8.1f}us".format(
+            User.count(), median_latency(client, '/api/v1/stats', requests)))
+        size *= 10
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Batch session validation against one request per session
+
+Usage: ./bench_validate.py [sessions] [batch]
+
+Creates `sessions` sessions, then validates all of them through the
+Flask test client: one GET /api/v1/auth/verify per session, then POST
+/api/v1/auth_session/validate with `batch` session ids per request, as
+a gateway holding SESSION_VALIDATE_TOKEN. Reports the time per session
+and the requests sent.
+"""
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODELS = os.path.join(os.path.dirname(HERE), "0x01-Basic_authentication")
+
+
+def per_item(client, session_ids: list) -> int:
+    """Validates each session with its own verify request.
+    """
+    for session_id in session_ids:
+        client.set_cookie('_my_session_id', session_id)
+        response = client.get('/api/v1/auth/verify')
+        assert response.status_code == 200, response.status
+    client.delete_cookie('_my_session_id')
+    return len(session_ids)
+
+
+def batched(client, session_ids: list, batch: int) -> int:
+    """Validates the sessions `batch` at a time.
+    """
+    requests = 0
+    for start in range(0, len(session_ids), batch):
+        chunk = session_ids[start:start + batch]
+        response = client.post('/api/v1/auth_session/validate', json=chunk,
+                               headers={'X-Gateway-Token': 'bench'})
+        assert response.status_code == 200, response.status
+        assert None not in response.get_json()
+        requests += 1
+    return requests
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    sys.path[:0] = [HERE, MODELS]
+    os.environ.update(AUTH_TYPE='session_auth', SESSION_NAME='_my_session_id',
+                      SESSION_VALIDATE_MAX_BATCH=str(batch),
+                      SESSION_VALIDATE_TOKEN='bench')
+    os.chdir(tempfile.mkdtemp())
+    from api.v1.app import app, auth
+    from models.user import User
+    user = User(email="bench@holberton.io")
+    user.save()
+    session_ids = [auth.create_session(user.id) for _ in range(sessions)]
+
+    client = app.test_client()
+    for label, run in (('per-item', lambda: per_item(client, session_ids)),
+                       ('batch {}'.format(batch),
+                        lambda: batched(client, session_ids, batch))):
+        start = time.perf_counter()
+        requests = run()
+        elapsed = time.perf_counter() - start
+        print("{:<12} {:9.2f}us/session  {:7,} requests  {:9,.0f}/s".format(
+            label, elapsed * 1e6 / sessions, requests, sessions / elapsed))
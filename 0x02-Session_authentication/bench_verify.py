@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Latency of GET /api/v1/auth/verify against the full view stack
+
+Usage: ./bench_verify.py [requests] [budget_us]
+
+Calls the WSGI app directly with a prepared environ: the verify endpoint
+and, for comparison, GET /api/v1/users/me?fields=id, both with a valid
+session cookie. Exits with 1 if the verify p50 is over budget_us
+microseconds.
+"""
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODELS = os.path.join(os.path.dirname(HERE), "0x01-Basic_authentication")
+
+
+def latencies(app, environ: dict, requests: int) -> list:
+    """Returns the sorted latencies of `requests` calls, in microseconds.
+    """
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    samples = []
+    for _ in range(requests):
+        env = dict(environ)
+        start = time.perf_counter()
+        for _ in app(env, start_response):
+            pass
+        samples.append((time.perf_counter() - start) * 1e6)
+    assert all(status.startswith('200') for status in statuses), statuses[-1]
+    return sorted(samples)
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    sys.path[:0] = [HERE, MODELS]
+    os.environ.update(AUTH_TYPE='session_auth', SESSION_NAME='_my_session_id')
+    os.chdir(tempfile.mkdtemp())
+    from werkzeug.test import EnvironBuilder
+    from api.v1.app import app, auth
+    from models.user import User
+    user = User(email="bench@holberton.io")
+    user.save()
+    cookie = '_my_session_id=' + auth.create_session(user.id)
+
+    results = {}
+    for label, path in (('verify', '/api/v1/auth/verify'),
+                        ('users/me', '/api/v1/users/me?fields=id')):
+        environ = EnvironBuilder(path=path,
+                                 headers={'Cookie': cookie}).get_environ()
+        samples = latencies(app, environ, requests)
+        results[label] = samples[len(samples) // 2]
+        print("{:<9} p50 {:7.1f}us  p99 {:7.1f}us".format(
+            label, samples[len(samples) // 2],
+            samples[int(len(samples) * 0.99)]))
+    if results['verify'] > budget:
+        print("verify p50 over the {:.0f}us budget".format(budget))
+        sys.exit(1)
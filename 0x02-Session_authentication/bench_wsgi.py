@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Startup time, throughput and memory of app.run against gunicorn
+
+Usage: ./bench_wsgi.py [users] [seconds] [clients]
+
+Seeds a User store in a scratch directory, then for each server measures
+the time until /api/v1/status answers, the GET /api/v1/users/:id rate
+under basic authentication from `clients` keep-alive threads, and the
+proportional set size (PSS) of the server processes.
+"""
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODELS = os.path.join(os.path.dirname(HERE), "0x01-Basic_authentication")
+PORT = 5077
+EMAIL = "bench@holberton.io"
+PASSWD = "b4l0u"
+
+
+def seed(directory: str, users: int) -> list:
+    """Writes a store of `users` users and returns their IDs.
+    """
+    sys.path.insert(0, MODELS)
+    from models.user import User
+    objs = {}
+    for i in range(users):
+        user = User(id=str(uuid.uuid4()))
+        user.email = EMAIL if i == 0 else "user{}@holberton.io".format(i)
+        user.password = PASSWD
+        objs[user.id] = user.to_json(True)
+    with open(os.path.join(directory, ".db_User.json"), "w") as f:
+        json.dump(objs, f)
+    return list(objs)
+
+
+def pss_kb(pid: int) -> int:
+    """Returns the PSS of a process and its children, 0 if unknown.
+    """
+    total = 0
+    try:
+        with open("/proc/{}/smaps_rollup".format(pid)) as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1])
+        with open("/proc/{}/task/{}/children".format(pid, pid)) as f:
+            children = [int(c) for c in f.read().split()]
+    except (OSError, ValueError):
+        return total
+    return total + sum(pss_kb(child) for child in children)
+
+
+def load(user_ids: list, seconds: float, clients: int) -> float:
+    """Sends GET /api/v1/users/:id from keep-alive threads.
+
+    Returns:
+        float: The number of 200 responses per second.
+    """
+    token = base64.b64encode("{}:{}".format(EMAIL, PASSWD).encode())
+    headers = {"Authorization": "Basic " + token.decode()}
+    counts = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def run(index: int) -> None:
+        session = requests.Session()
+        i = index
+        while time.perf_counter() < deadline:
+            url = "http://127.0.0.1:{}/api/v1/users/{}".format(
+                PORT, user_ids[i % len(user_ids)])
+            if session.get(url, headers=headers).status_code == 200:
+                counts[index] += 1
+            i += clients
+
+    threads = [threading.Thread(target=run, args=(i,))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def bench(label: str, command: list, env: dict, directory: str,
+          user_ids: list, seconds: float, clients: int) -> None:
+    """Starts a server, measures it and stops it.
+    """
+    start = time.perf_counter()
+    server = subprocess.Popen(command, cwd=directory, env=env,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                requests.get("http://127.0.0.1:{}/api/v1/status".format(PORT))
+                break
+            except requests.ConnectionError:
+                if server.poll() is not None or \
+                        time.perf_counter() - start > 60:
+                    print("{:<22} failed to start".format(label))
+                    return
+                time.sleep(0.02)
+        startup = time.perf_counter() - start
+        rate = load(user_ids, seconds, clients)
+        print("{:<22} startup {:6.2f}s  {:8.1f} req/s  PSS {:7,} kB".format(
+            label, startup, rate, pss_kb(server.pid)))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    workers = str(max(2, os.cpu_count() or 1))
+    with tempfile.TemporaryDirectory() as directory:
+        user_ids = seed(directory, users)
+        env = dict(os.environ, AUTH_TYPE="basic_auth", API_PORT=str(PORT),
+                   API_HOST="127.0.0.1",
+                   PYTHONPATH=os.pathsep.join([HERE, MODELS]))
+        gunicorn = [sys.executable, "-m", "gunicorn", "-c",
+                    os.path.join(HERE, "gunicorn.conf.py"), "wsgi:app"]
+        runs = (
+            ("app.run", [sys.executable, "-m", "api.v1.app"], {}),
+            ("gunicorn 1x8 threads", gunicorn, {"API_WORKERS": "1"}),
+            ("gunicorn {}x8 threads".format(workers), gunicorn,
+             {"API_WORKERS": workers}),
+        )
+        for label, command, extra in runs:
+            bench(label, command, dict(env, **extra), directory, user_ids,
+                  seconds, clients)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Gunicorn settings for the API
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+
+The app, and with it the User store, is loaded once in the master and
+the workers are forked from it. SIGHUP reloads gracefully: the master
+re-reads these settings and the store, starts new workers and lets the
+old ones finish their requests.
+
+The store and the sessions of session_auth are kept in each worker's
+memory, so a session opened through one worker is unknown to the
+others. Run several workers only with AUTH_TYPE=basic_auth or
+signed_session_auth and rare writes; otherwise scale with threads.
+"""
+import gc
+import os
+
+bind = "{}:{}".format(os.getenv("API_HOST", "0.0.0.0"),
+                      os.getenv("API_PORT", "5000"))
+preload_app = True
+workers = int(os.getenv("API_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("API_THREADS", "8"))
+keepalive = int(os.getenv("API_KEEPALIVE", "5"))
+timeout = int(os.getenv("API_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("API_GRACEFUL_TIMEOUT", "30"))
+
+# This project uses the models of 0x01-Basic_authentication
+_here = os.path.dirname(os.path.abspath(__file__))
+if not os.path.isdir(os.path.join(_here, "models")):
+    pythonpath = os.getenv("API_PYTHONPATH", os.path.join(
+        os.path.dirname(_here), "0x01-Basic_authentication"))
+
+
+def on_reload(server):
+    """Re-reads the User store in the master before new workers fork.
+    """
+    from models.user import User
+    User.load_from_file()
+    gc.freeze()
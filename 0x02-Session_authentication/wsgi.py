@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for production servers
+
+Importing the app loads the User store. Under gunicorn with preload_app
+(see gunicorn.conf.py) that happens once, in the master. Freezing the
+garbage collector afterwards moves the loaded objects out of its reach,
+so collections in the forked workers don't write to (and copy) the
+pages they share with the master.
+"""
+import gc
+
+from api.v1.app import app
+
+gc.freeze()
+application = app
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Admission control for password hashing and login attempts
+"""
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from time import monotonic, perf_counter
+from typing import Iterator, Tuple
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _env_number(name: str, default: float) -> float:
+    """Reads a numeric setting from the environment.
+    """
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class Overloaded(Exception):
+    """Raised when the password gate cannot admit more work.
+    """
+
+
+class PasswordGate:
+    """Bounds the number of concurrent bcrypt operations.
+
+    At most ``max_concurrency`` callers run at once and at most
+    ``max_queue`` more wait for a slot. Anyone beyond that, or anyone
+    who waits longer than ``queue_timeout`` seconds, gets Overloaded
+    straight away instead of tying up a worker.
+    """
+
+    def __init__(self, max_concurrency: int = None, max_queue: int = None,
+                 queue_timeout: float = None) -> None:
+        """Initializes the gate, defaulting to the environment settings.
+        """
+        cpus = os.cpu_count() or 1
+        if max_concurrency is None:
+            max_concurrency = int(
+                _env_number('BCRYPT_MAX_CONCURRENCY', cpus))
+        if max_queue is None:
+            max_queue = int(_env_number('BCRYPT_MAX_QUEUE', 2 * cpus))
+        if queue_timeout is None:
+            queue_timeout = _env_number('BCRYPT_QUEUE_TIMEOUT', 1.0)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._wait_sum = 0.0
+        self._wait_counts = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def acquire(self) -> None:
+        """Takes a slot, waiting at most ``queue_timeout`` seconds.
+
+        Raises Overloaded when the queue is full or the wait times out.
+        """
+        start = perf_counter()
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    self._rejected += 1
+                    raise Overloaded()
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        waited = perf_counter() - start
+        with self._lock:
+            self._wait_sum += waited
+            self._wait_counts[bisect_left(WAIT_BUCKETS, waited)] += 1
+            if acquired:
+                self._admitted += 1
+            else:
+                self._rejected += 1
+        if not acquired:
+            raise Overloaded()
+
+    def release(self) -> None:
+        """Gives back a slot taken with acquire.
+        """
+        self._slots.release()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Holds one of the gate's slots for the duration of the block.
+        """
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """Returns the gate counters and the queue wait histogram.
+        """
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "waiting": self._waiting,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "wait_seconds_sum": self._wait_sum,
+                "wait_seconds_buckets": dict(zip(
+                    [str(b) for b in WAIT_BUCKETS] + ["+Inf"],
+                    self._wait_counts,
+                )),
+            }
+
+
+class RateLimiter:
+    """Token buckets keyed by an arbitrary string (email, client address).
+
+    Each key refills at ``rate`` tokens per second up to ``burst``
+    tokens. Only the ``max_keys`` most recently used keys are tracked.
+    """
+
+    def __init__(self, rate: float, burst: float,
+                 max_keys: int = 10000) -> None:
+        """Initializes an empty set of buckets.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        """Takes one token from the key's bucket if there is one.
+        """
+        if self.rate <= 0 or key is None:
+            return True
+        now = monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed
+
+
+def login_rate_limiters() -> Tuple[RateLimiter, RateLimiter]:
+    """Builds the per-client and per-email login limiters.
+    """
+    client_limiter = RateLimiter(
+        _env_number('LOGIN_CLIENT_RATE', 2),
+        _env_number('LOGIN_CLIENT_BURST', 20),
+    )
+    email_limiter = RateLimiter(
+        _env_number('LOGIN_EMAIL_RATE', 0.2),
+        _env_number('LOGIN_EMAIL_BURST', 5),
+    )
+    return client_limiter, email_limiter
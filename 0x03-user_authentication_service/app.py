@@ -3,11 +3,35 @@
 A basic Flask app for managing a digital library
 """
 
+from admission import Overloaded, login_rate_limiters
 from auth import Auth
 from flask import Flask, jsonify, request, abort, redirect
+from metrics import CONTENT_TYPE, REGISTRY, instrument, numeric_gauges, span
+from profiling import PROFILER
 
 AUTH = Auth()
 app = Flask(__name__)
+instrument(app)
+PROFILER.attach(app)
+CLIENT_LIMITER, EMAIL_LIMITER = login_rate_limiters()
+
+
+@app.errorhandler(Overloaded)
+def overloaded(error) -> str:
+    """Overloaded handler
+    Return:
+        - 503 with a hint to retry once the password gate drains
+    """
+    response = jsonify({"message": "service overloaded"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+@app.teardown_appcontext
+def close_db_session(exception) -> None:
+    """Releases the request thread's database session.
+    """
+    AUTH.close_db_session()
 
 
 @app.route('/', methods=['GET'], strict_slashes=False)
@@ -30,6 +54,8 @@ def users() -> str:
     try:
         AUTH.register_user(email, password)
         return jsonify({"email": f"{email}", "message": "user created"}), 200
+    except Overloaded:
+        raise
     except Exception:
         return jsonify({"message": "email already registered"}), 400
 
@@ -42,10 +68,14 @@ def login() -> str:
     """
     email = request.form.get('email')
     password = request.form.get('password')
-    valid_login = AUTH.valid_login(email, password)
-    if not valid_login:
+    if not CLIENT_LIMITER.allow(request.remote_addr) or \
+            not EMAIL_LIMITER.allow(email):
+        response = jsonify({"message": "too many login attempts"})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    session_id = AUTH.login(email, password)
+    if session_id is None:
         abort(401)
-    session_id = AUTH.create_session(email)
     response = jsonify({"email": f"{email}", "message": "logged in"})
     response.set_cookie('session_id', session_id)
     return response
@@ -58,9 +88,10 @@ def logout() -> str:
         - Redirects to home route
     """
     session_id = request.cookies.get('session_id')
-    user = AUTH.get_user_from_session_id(session_id)
+    with span('auth'):
+        user = AUTH.get_user_from_session_id(session_id)
     if user:
-        AUTH.destroy_session(user.id)
+        AUTH.destroy_session(user.id, session_id)
         return redirect('/')
     else:
         abort(403)
@@ -73,7 +104,8 @@ def profile() -> str:
         - The user's profile information
     """
     session_id = request.cookies.get('session_id')
-    user = AUTH.get_user_from_session_id(session_id)
+    with span('auth'):
+        user = AUTH.get_user_from_session_id(session_id)
     if user:
         return jsonify({"email": user.email}), 200
     else:
@@ -87,12 +119,11 @@ def get_reset_password_token() -> str:
         - The user's password reset payload
     """
     email = request.form.get('email')
-    user = AUTH.create_session(email)
-    if not user:
-        abort(403)
-    else:
+    try:
         token = AUTH.get_reset_password_token(email)
-        return jsonify({"email": f"{email}", "reset_token": f"{token}"})
+    except ValueError:
+        abort(403)
+    return jsonify({"email": f"{email}", "reset_token": f"{token}"})
 
 
 @app.route('/reset_password', methods=['PUT'], strict_slashes=False)
@@ -109,9 +140,102 @@ def update_password() -> str:
         AUTH.update_password(reset_token, new_password)
         return jsonify({"email": f"{email}",
                         "message": "Password updated"}), 200
+    except Overloaded:
+        raise
     except Exception:
         abort(403)
 
 
+@app.route('/admission', methods=['GET'], strict_slashes=False)
+def admission() -> str:
+    """GET /admission
+    Return:
+        - The password gate counters and queue wait histogram
+    """
+    return jsonify(AUTH.password_gate_stats()), 200
+
+
+@app.route('/session_cache', methods=['GET'], strict_slashes=False)
+def session_cache() -> str:
+    """GET /session_cache
+    Return:
+        - The session cache hit, miss and eviction counters
+    """
+    return jsonify(AUTH.session_cache_stats()), 200
+
+
+@app.route('/metrics', methods=['GET'], strict_slashes=False)
+def metrics() -> str:
+    """GET /metrics
+    Return:
+        - Request counters, latency histograms and admission and session
+          cache gauges in the Prometheus text format
+    """
+    gauges = numeric_gauges('password_gate_', AUTH.password_gate_stats())
+    gauges.update(numeric_gauges('session_cache_',
+                                 AUTH.session_cache_stats()))
+    return REGISTRY.render(gauges), 200, {'Content-Type': CONTENT_TYPE}
+
+
+@app.before_request
+def require_profiler_token() -> None:
+    """Restricts the profiler routes to holders of PROFILER_TOKEN
+    """
+    if request.path.startswith('/profiler') and \
+            not PROFILER.authorized(request.headers.get('X-Profiler-Token')):
+        abort(403)
+
+
+@app.route('/profiler', methods=['GET'], strict_slashes=False)
+def profiler() -> str:
+    """GET /profiler
+    Return:
+        - The sample rate and the number of profiled requests per route
+    """
+    return jsonify(PROFILER.summary()), 200
+
+
+@app.route('/profiler', methods=['PUT'], strict_slashes=False)
+def set_profiler_rate() -> str:
+    """PUT /profiler
+    Return:
+        - The profiler summary once the sample rate is set
+    """
+    try:
+        PROFILER.set_rate(request.form.get('rate'))
+    except (TypeError, ValueError):
+        return jsonify({"message": "rate must be a number"}), 400
+    return jsonify(PROFILER.summary()), 200
+
+
+@app.route('/profiler', methods=['DELETE'], strict_slashes=False)
+def reset_profiler() -> str:
+    """DELETE /profiler
+    Return:
+        - The profiler summary once the results are dropped
+    """
+    PROFILER.reset()
+    return jsonify(PROFILER.summary()), 200
+
+
+@app.route('/profiler/dump', methods=['GET'], strict_slashes=False)
+def dump_profiler() -> str:
+    """GET /profiler/dump?route=<METHOD /rule>&format=<pstats|text>
+    Return:
+        - The profile of a route, or of all routes, as a pstats file or
+          as text
+    """
+    fmt = request.args.get('format', 'pstats')
+    result = PROFILER.dump(request.args.get('route'), fmt)
+    if result is None:
+        abort(404)
+    if fmt == 'text':
+        return result, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    return result, 200, {
+        'Content-Type': 'application/octet-stream',
+        'Content-Disposition': 'attachment; filename=profile.pstats',
+    }
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port="5000")
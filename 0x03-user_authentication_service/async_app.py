@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Asynchronous entry point for the digital library
+
+Serves the same routes as app.py on an asyncio event loop. Auth calls,
+which block on SQLite and on the bcrypt pool, run on a dedicated
+thread pool so the loop keeps accepting requests.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
+
+from aiohttp import web
+
+from admission import Overloaded, login_rate_limiters
+from auth import Auth
+from metrics import CONTENT_TYPE, REGISTRY, numeric_gauges
+
+AUTH = Auth()
+AUTH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv('AUTH_WORKERS', '8')),
+    thread_name_prefix='auth',
+)
+CLIENT_LIMITER, EMAIL_LIMITER = login_rate_limiters()
+routes = web.RouteTableDef()
+
+
+def call_auth(method, *args):
+    """Calls an Auth method, then releases the thread's DB session.
+    """
+    try:
+        return method(*args)
+    finally:
+        AUTH.close_db_session()
+
+
+async def run_auth(method, *args):
+    """Runs a blocking Auth method on the auth thread pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        AUTH_EXECUTOR, partial(call_auth, method, *args))
+
+
+def overloaded_response() -> web.Response:
+    """Builds the 503 returned when the password gate is full.
+    """
+    return web.json_response(
+        {"message": "service overloaded"},
+        status=503,
+        headers={'Retry-After': '1'},
+    )
+
+
+@routes.get('/')
+async def home(request: web.Request) -> web.Response:
+    """GET /
+    Return:
+        - The welcome message for the digital library
+    """
+    return web.json_response({"message": "Bienvenue"})
+
+
+@routes.post('/users')
+async def users(request: web.Request) -> web.Response:
+    """POST /users
+    Return:
+        - The account creation payload
+    """
+    form = await request.post()
+    email = form.get('email')
+    password = form.get('password')
+    try:
+        await run_auth(AUTH.register_user, email, password)
+        return web.json_response({"email": f"{email}",
+                                  "message": "user created"})
+    except Overloaded:
+        return overloaded_response()
+    except Exception:
+        return web.json_response(
+            {"message": "email already registered"}, status=400)
+
+
+@routes.post('/sessions')
+async def login(request: web.Request) -> web.Response:
+    """POST /sessions
+    Return:
+        - The account login payload
+    """
+    form = await request.post()
+    email = form.get('email')
+    password = form.get('password')
+    if not CLIENT_LIMITER.allow(request.remote) or \
+            not EMAIL_LIMITER.allow(email):
+        return web.json_response(
+            {"message": "too many login attempts"},
+            status=429,
+            headers={'Retry-After': '1'},
+        )
+    try:
+        session_id = await run_auth(AUTH.login, email, password)
+    except Overloaded:
+        return overloaded_response()
+    if session_id is None:
+        raise web.HTTPUnauthorized()
+    response = web.json_response({"email": f"{email}",
+                                  "message": "logged in"})
+    response.set_cookie('session_id', session_id)
+    return response
+
+
+@routes.delete('/sessions')
+async def logout(request: web.Request) -> web.Response:
+    """DELETE /sessions
+    Return:
+        - Redirects to home route
+    """
+    session_id = request.cookies.get('session_id')
+    user = await run_auth(AUTH.get_user_from_session_id, session_id)
+    if not user:
+        raise web.HTTPForbidden()
+    await run_auth(AUTH.destroy_session, user.id, session_id)
+    raise web.HTTPFound('/')
+
+
+@routes.get('/profile')
+async def profile(request: web.Request) -> web.Response:
+    """GET /profile
+    Return:
+        - The user's profile information
+    """
+    session_id = request.cookies.get('session_id')
+    user = await run_auth(AUTH.get_user_from_session_id, session_id)
+    if not user:
+        raise web.HTTPForbidden()
+    return web.json_response({"email": user.email})
+
+
+@routes.post('/reset_password')
+async def get_reset_password_token(request: web.Request) -> web.Response:
+    """POST /reset_password
+    Return:
+        - The user's password reset payload
+    """
+    form = await request.post()
+    email = form.get('email')
+    try:
+        token = await run_auth(AUTH.get_reset_password_token, email)
+    except ValueError:
+        raise web.HTTPForbidden()
+    return web.json_response({"email": f"{email}", "reset_token": f"{token}"})
+
+
+@routes.put('/reset_password')
+async def update_password(request: web.Request) -> web.Response:
+    """PUT /reset_password
+    Return:
+        - The user's password updated payload
+    """
+    form = await request.post()
+    email = form.get('email')
+    reset_token = form.get('reset_token')
+    new_password = form.get('new_password')
+    try:
+        await run_auth(AUTH.update_password, reset_token, new_password)
+    except Overloaded:
+        return overloaded_response()
+    except Exception:
+        raise web.HTTPForbidden()
+    return web.json_response({"email": f"{email}",
+                              "message": "Password updated"})
+
+
+@routes.get('/admission')
+async def admission(request: web.Request) -> web.Response:
+    """GET /admission
+    Return:
+        - The password gate counters and queue wait histogram
+    """
+    return web.json_response(AUTH.password_gate_stats())
+
+
+@routes.get('/session_cache')
+async def session_cache(request: web.Request) -> web.Response:
+    """GET /session_cache
+    Return:
+        - The session cache hit, miss and eviction counters
+    """
+    return web.json_response(AUTH.session_cache_stats())
+
+
+@routes.get('/metrics')
+async def metrics(request: web.Request) -> web.Response:
+    """GET /metrics
+    Return:
+        - Request counters, latency histograms and admission and session
+          cache gauges in the Prometheus text format
+    """
+    gauges = numeric_gauges('password_gate_', AUTH.password_gate_stats())
+    gauges.update(numeric_gauges('session_cache_',
+                                 AUTH.session_cache_stats()))
+    return web.Response(body=REGISTRY.render(gauges).encode('utf-8'),
+                        headers={'Content-Type': CONTENT_TYPE})
+
+
+@web.middleware
+async def record_request(request: web.Request, handler) -> web.Response:
+    """Counts and times every request by route, method and status.
+    """
+    start = perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None \
+            else '<unmatched>'
+        REGISTRY.observe_request(route, request.method, status,
+                                 perf_counter() - start)
+
+
+def create_app() -> web.Application:
+    """Builds the aiohttp application.
+    """
+    application = web.Application(middlewares=[record_request])
+    application.add_routes(routes)
+    return application
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host="0.0.0.0",
+                port=int(os.getenv('PORT', '5000')))
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 """UserManager Module
 """
+import os
 import bcrypt
+from datetime import datetime, timedelta
 from uuid import uuid4
 from typing import Union
 from sqlalchemy.orm.exc import NoResultFound
 
+from cache import SessionCache, UserSnapshot
 from db import DB
+from hashing import PasswordHasher
 from user import User
 
 
@@ -22,6 +26,22 @@ def _generate_uuid() -> str:
     return str(uuid4())
 
 
+def _session_expiry() -> Union[datetime, None]:
+    """Returns the expiry of a session opened now, if sessions expire.
+    """
+    duration = int(os.getenv('SESSION_DURATION', '86400'))
+    if duration <= 0:
+        return None
+    return datetime.utcnow() + timedelta(seconds=duration)
+
+
+def _reset_token_expiry() -> datetime:
+    """Returns the expiry of a reset token issued now.
+    """
+    duration = int(os.getenv('RESET_TOKEN_DURATION', '3600'))
+    return datetime.utcnow() + timedelta(seconds=duration)
+
+
 class Auth:
     """Auth class to interact with the authentication database.
     """
@@ -30,6 +50,8 @@ class Auth:
         """Initializes a new Auth instance.
         """
         self._db = DB()
+        self._hasher = PasswordHasher()
+        self._sessions = SessionCache()
 
     def register_user(self, email: str, password: str) -> User:
         """Adds a new user to the database.
@@ -37,7 +59,7 @@ class Auth:
         try:
             self._db.find_user_by(email=email)
         except NoResultFound:
-            return self._db.add_user(email, _hash_password(password))
+            return self._db.add_user(email, self._hasher.hash(password))
         raise ValueError("User {} already exists".format(email))
 
     def valid_login(self, email: str, password: str) -> bool:
@@ -47,74 +69,121 @@ class Auth:
         try:
             user = self._db.find_user_by(email=email)
             if user is not None:
-                return bcrypt.checkpw(
-                    password.encode("utf-8"),
-                    user.hashed_password,
-                )
+                return self._hasher.check(password, user.hashed_password)
         except NoResultFound:
             return False
         return False
 
-    def create_session(self, email: str) -> str:
-        """Creates a new session for a user.
+    def login(self, email: str, password: str) -> Union[str, None]:
+        """Checks a user's login details and opens a session.
+
+        The user is fetched once. The session row is inserted only if
+        the user still has the verified password hash, so a password
+        changed during verification makes the login fail.
         """
-        user = None
         try:
             user = self._db.find_user_by(email=email)
         except NoResultFound:
             return None
-        if user is None:
+        if password is None or \
+                not self._hasher.check(password, user.hashed_password):
+            return None
+        session_id = _generate_uuid()
+        user_id = self._db.create_session_where(
+            {'id': user.id, 'hashed_password': user.hashed_password},
+            session_id,
+            _session_expiry(),
+        )
+        if user_id is None:
             return None
+        return session_id
+
+    def create_session(self, email: str) -> str:
+        """Creates a new session for a user.
+
+        A user may hold any number of sessions at once.
+        """
         session_id = _generate_uuid()
-        self._db.update_user(user.id, session_id=session_id)
+        user_id = self._db.create_session_where(
+            {'email': email}, session_id, _session_expiry())
+        if user_id is None:
+            return None
         return session_id
 
-    def get_user_from_session_id(self, session_id: str) -> Union[User, None]:
+    def get_user_from_session_id(
+            self, session_id: str) -> Union[UserSnapshot, None]:
         """Retrieves a user based on a given session ID.
+
+        Lookups are served from the session cache when possible.
         """
-        user = None
         if session_id is None:
             return None
+        user = self._sessions.get(session_id)
+        if user is not None:
+            return user
+        generation = self._sessions.generation
         try:
-            user = self._db.find_user_by(session_id=session_id)
+            user = self._db.find_user_by_session(session_id)
         except NoResultFound:
             return None
-        return user
+        snapshot = UserSnapshot(user.id, user.email)
+        self._sessions.put(session_id, snapshot, generation)
+        return snapshot
 
-    def destroy_session(self, user_id: int) -> None:
-        """Destroys a session associated with a given user.
+    def destroy_session(self, user_id: int, session_id: str = None) -> None:
+        """Destroys a session of a given user, or all of the user's
+        sessions when no session ID is given.
         """
         if user_id is None:
             return None
-        self._db.update_user(user_id, session_id=None)
+        self._db.delete_sessions(user_id, session_id)
+        self._sessions.invalidate_user(user_id)
+
+    def purge_expired_sessions(self, batch_size: int = 1000) -> int:
+        """Deletes expired sessions in batches.
+        """
+        return self._db.purge_expired_sessions(batch_size)
+
+    def purge_expired_reset_tokens(self, batch_size: int = 1000) -> int:
+        """Clears expired reset tokens in batches.
+        """
+        return self._db.purge_expired_reset_tokens(batch_size)
 
     def get_reset_password_token(self, email: str) -> str:
         """Generates a password reset token for a user.
         """
-        user = None
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            user = None
-        if user is None:
-            raise ValueError()
         reset_token = _generate_uuid()
-        self._db.update_user(user.id, reset_token=reset_token)
+        if self._db.set_reset_token_by_email(
+                email, reset_token, _reset_token_expiry()) is None:
+            raise ValueError()
         return reset_token
 
     def update_password(self, reset_token: str, password: str) -> None:
         """Updates a user's password given the user's reset token.
+
+        The token is looked up before hashing, so that unknown tokens
+        cost no bcrypt work; the UPDATE still checks it again.
         """
-        user = None
-        try:
-            user = self._db.find_user_by(reset_token=reset_token)
-        except NoResultFound:
-            user = None
-        if user is None:
+        if not self._db.has_reset_token(reset_token):
             raise ValueError()
-        new_password_hash = _hash_password(password)
-        self._db.update_user(
-            user.id,
-            hashed_password=new_password_hash,
-            reset_token=None,
-        )
+        new_password_hash = self._hasher.hash(password)
+        user_id = self._db.consume_reset_token(reset_token, new_password_hash)
+        if user_id is None:
+            raise ValueError()
+        self._sessions.invalidate_user(user_id)
+
+    def password_gate_stats(self) -> dict:
+        """Returns the admission counters of the password gate.
+        """
+        return self._hasher.gate.stats()
+
+    def session_cache_stats(self) -> dict:
+        """Returns the hit, miss and eviction counters of the session
+        cache.
+        """
+        return self._sessions.stats()
+
+    def close_db_session(self) -> None:
+        """Releases the database session of the calling thread.
+        """
+        self._db.close_session()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Concurrency comparison of the Flask and asyncio entry points
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+EMAIL = "bench@holberton.io"
+PASSWD = "b4l0u"
+SERVERS = {
+    'flask': "from app import app; app.run(port={port}, threaded=True)",
+    'asyncio': "import async_app; from aiohttp import web; "
+               "web.run_app(async_app.create_app(), port={port})",
+}
+
+
+async def wait_ready(base_url: str, timeout: float = 15) -> None:
+    """Polls the home route until the server answers.
+    """
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(base_url + '/') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                if time.monotonic() > deadline:
+                    raise
+            await asyncio.sleep(0.1)
+
+
+async def load(base_url: str, path: str, concurrency: int,
+               requests: int) -> float:
+    """
+    Sends `requests` requests to `path` over `concurrency` connections.
+
+    Returns:
+        float: The number of 200 responses per second.
+    """
+    async with aiohttp.ClientSession() as session:
+        await session.post(base_url + '/users',
+                           data={'email': EMAIL, 'password': PASSWD})
+        async with session.post(base_url + '/sessions', data={
+                'email': EMAIL, 'password': PASSWD}) as response:
+            session_id = response.cookies['session_id'].value
+        queue = asyncio.Queue()
+        for _ in range(requests):
+            queue.put_nowait(None)
+        ok = 0
+
+        async def worker() -> None:
+            nonlocal ok
+            while not queue.empty():
+                queue.get_nowait()
+                if path == '/sessions':
+                    request = session.post(base_url + path, data={
+                        'email': EMAIL, 'password': PASSWD})
+                else:
+                    request = session.get(base_url + path,
+                                          cookies={'session_id': session_id})
+                async with request as response:
+                    await response.read()
+                    ok += response.status == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return ok / (time.perf_counter() - start)
+
+
+def main(concurrency: int, requests: int, port: int = 5055) -> None:
+    """Benchmarks each server in turn on the same port.
+    """
+    env = dict(os.environ, LOGIN_CLIENT_RATE='0', LOGIN_EMAIL_RATE='0',
+               BCRYPT_MAX_QUEUE=str(concurrency))
+    base_url = 'http://127.0.0.1:{}'.format(port)
+    for name, code in SERVERS.items():
+        server = subprocess.Popen(
+            [sys.executable, '-c', code.format(port=port)], env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(wait_ready(base_url))
+            for path, count in (('/profile', requests),
+                                ('/sessions', max(1, requests // 50))):
+                rate = asyncio.run(load(base_url, path, concurrency, count))
+                print("{:<8} {:<10} c={:<4} {:>9.1f} req/s".format(
+                    name, path, concurrency, rate))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 32,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Multi-threaded DB throughput and isolation check against local SQLite
+"""
+import sys
+import threading
+import time
+
+from db import DB
+
+
+def worker(db: DB, index: int, operations: int, errors: list) -> None:
+    """
+    Reads and updates the thread's own user `operations` times.
+
+    Any user returned for another thread's email is recorded in errors.
+    """
+    email = 'thread{}@holberton.io'.format(index)
+    try:
+        for i in range(operations):
+            user = db.find_user_by(email=email)
+            if user.email != email:
+                errors.append((email, user.email))
+            if i % 10 == 0:
+                db.update_user(user.id, session_id='{}-{}'.format(index, i))
+    except Exception as e:
+        errors.append((email, repr(e)))
+    finally:
+        db.close_session()
+
+
+def run(db: DB, threads: int, operations: int) -> float:
+    """
+    Runs `threads` workers concurrently.
+
+    Returns:
+        float: The number of operations per second.
+    """
+    errors = []
+    pool = [threading.Thread(target=worker, args=(db, i, operations, errors))
+            for i in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    assert not errors, "cross-thread leaks or failures: {}".format(errors[:5])
+    return threads * operations / elapsed
+
+
+if __name__ == "__main__":
+    max_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    db = DB()
+    for i in range(max_threads):
+        db.add_user('thread{}@holberton.io'.format(i), 'x')
+    db.close_session()
+    threads = 1
+    while threads <= max_threads:
+        print("threads {:>3}: {:>9.0f} ops/s".format(
+            threads, run(db, threads, operations)))
+        threads *= 2
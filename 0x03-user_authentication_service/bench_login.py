@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Login throughput load test against the Flask test client
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+EMAIL = "bench@holberton.io"
+PASSWD = "b4l0u"
+
+
+def run(concurrency: int, logins: int) -> float:
+    """
+    Sends `logins` POST /sessions requests from `concurrency` threads.
+
+    Returns:
+        float: The number of successful logins per second.
+    """
+    from app import app
+
+    def login(_) -> int:
+        client = app.test_client()
+        response = client.post('/sessions', data={
+            'email': EMAIL, 'password': PASSWD})
+        return response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        codes = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    return codes.count(200) / elapsed
+
+
+if __name__ == "__main__":
+    max_concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else \
+        os.cpu_count() or 1
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    os.environ['LOGIN_EMAIL_RATE'] = '0'
+    os.environ['LOGIN_CLIENT_RATE'] = '0'
+    os.environ.setdefault('BCRYPT_MAX_QUEUE', str(logins))
+    from app import AUTH
+    AUTH.register_user(EMAIL, PASSWD)
+    print("executor={} workers={} cores={}".format(
+        os.getenv('BCRYPT_EXECUTOR', 'thread'),
+        os.getenv('BCRYPT_WORKERS', os.cpu_count()), os.cpu_count()))
+    concurrency = 1
+    while concurrency <= max_concurrency:
+        print("concurrency {:>3}: {:>8.1f} logins/s".format(
+            concurrency, run(concurrency, logins)))
+        concurrency *= 2
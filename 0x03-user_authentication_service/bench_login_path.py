@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Query count, latency and race safety of the fused login path
+
+Usage: ./bench_login_path.py [runs]
+
+Compares Auth.valid_login + Auth.create_session with Auth.login. The
+user is stored with a cheap bcrypt cost so that the database round
+trips, not the hash, dominate the measurement. Since create_session
+inserts the session with a single statement, both paths take two
+queries and should show the same latency; Auth.login is kept for
+correctness, not speed. The race check changes the password while the
+old one is being verified: the split path still opens a session, the
+fused path must not.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import bcrypt
+from sqlalchemy import event
+
+EMAIL = "bench@holberton.io"
+PASSWD = "b4l0u"
+
+
+def split_login(auth) -> str:
+    """The login path used by POST /sessions before Auth.login.
+    """
+    if auth.valid_login(EMAIL, PASSWD):
+        return auth.create_session(EMAIL)
+
+
+def fused_login(auth) -> str:
+    """The fused login path.
+    """
+    return auth.login(EMAIL, PASSWD)
+
+
+def set_password(auth, password: str) -> None:
+    """Stores a new password for the bench user.
+    """
+    hashed_password = bcrypt.hashpw(password.encode("utf-8"),
+                                    bcrypt.gensalt(4))
+    auth._db.update_user_where({'email': EMAIL},
+                               hashed_password=hashed_password)
+
+
+def race(auth, login) -> bool:
+    """Changes the password while the login is verifying the old one.
+
+    Returns:
+        bool: True if the login opened a session anyway.
+    """
+    check = auth._hasher.check
+
+    def check_then_change(password, hashed_password):
+        valid = check(password, hashed_password)
+        set_password(auth, "changed")
+        return valid
+
+    auth._hasher.check = check_then_change
+    try:
+        return login(auth) is not None
+    finally:
+        auth._hasher.check = check
+        set_password(auth, PASSWD)
+        auth.close_db_session()
+
+
+def profile(auth, login, runs: int, statements: list) -> tuple:
+    """
+    Runs a login path `runs` times.
+
+    Returns:
+        tuple: The queries per login and the p50 and p99 latency in ms.
+    """
+    samples = []
+    del statements[:]
+    for _ in range(runs):
+        start = time.perf_counter()
+        assert login(auth) is not None
+        samples.append((time.perf_counter() - start) * 1000)
+        auth.close_db_session()
+    samples.sort()
+    return (len(statements) / runs, samples[len(samples) // 2],
+            samples[min(len(samples) - 1, int(len(samples) * 0.99))])
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_URL'] = "sqlite:///" + os.path.join(tmp, "l.db")
+        os.environ.setdefault('BCRYPT_EXECUTOR', 'inline')
+        from auth import Auth
+        auth = Auth()
+        auth._db.add_user(EMAIL, bcrypt.hashpw(
+            PASSWD.encode("utf-8"), bcrypt.gensalt(4)))
+        statements = []
+        event.listen(auth._db._engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        for name, login in (('split', split_login), ('fused', fused_login)):
+            queries, p50, p99 = profile(auth, login, runs, statements)
+            print("{:<6} {:.1f} queries/login  p50 {:.3f} ms  p99 {:.3f} ms"
+                  "  session after password change: {}".format(
+                      name, queries, p50, p99,
+                      "yes" if race(auth, login) else "no"))
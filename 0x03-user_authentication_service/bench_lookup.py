@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Lookup latency and query plans for the users table
+
+Seeds the local SQLite database (a.db, reset by DB()) with N users,
+then times DB.find_user_by on each indexed column and prints the
+EXPLAIN QUERY PLAN of the generated statement.
+"""
+import random
+import sys
+import time
+
+from sqlalchemy import insert, text
+
+from db import DB
+from user import User
+
+CHUNK = 50000
+
+
+def seed(db: DB, rows: int) -> None:
+    """Inserts `rows` users with a session ID and a reset token each.
+    """
+    with db._engine.begin() as connection:
+        for start in range(0, rows, CHUNK):
+            connection.execute(insert(User), [{
+                'email': 'user{}@holberton.io'.format(i),
+                'hashed_password': 'x',
+                'session_id': 'session-{}'.format(i),
+                'reset_token': 'reset-{}'.format(i),
+            } for i in range(start, min(rows, start + CHUNK))])
+
+
+def query_plan(db: DB, **kwargs) -> str:
+    """Returns the SQLite query plan of a find_user_by lookup.
+    """
+    criteria = [getattr(User, k) == v for k, v in kwargs.items()]
+    statement = db._session.query(User).filter(*criteria).statement
+    sql = str(statement.compile(
+        db._engine, compile_kwargs={"literal_binds": True}))
+    with db._engine.connect() as connection:
+        rows = connection.execute(text("EXPLAIN QUERY PLAN " + sql))
+        return "; ".join(row[-1] for row in rows)
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Returns a percentile of sorted samples.
+    """
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    db = DB()
+    start = time.perf_counter()
+    seed(db, rows)
+    print("seeded {:,} rows in {:.1f}s".format(
+        rows, time.perf_counter() - start))
+    for column, fmt in (('email', 'user{}@holberton.io'),
+                        ('session_id', 'session-{}'),
+                        ('reset_token', 'reset-{}')):
+        samples = []
+        for _ in range(lookups):
+            value = fmt.format(random.randrange(rows))
+            start = time.perf_counter()
+            db.find_user_by(**{column: value})
+            samples.append((time.perf_counter() - start) * 1e6)
+            db._session.expunge_all()
+        samples.sort()
+        print("{:<12} p50 {:>8.1f}us  p99 {:>8.1f}us  plan: {}".format(
+            column, percentile(samples, 0.5), percentile(samples, 0.99),
+            query_plan(db, **{column: fmt.format(0)})))
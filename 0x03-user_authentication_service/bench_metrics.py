@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Per-request cost of the metrics instrumentation
+
+Times the recording calls alone, then GET / through the Flask test
+client with and without instrument(app), alternating between the two
+and keeping the best run of each to reduce noise.
+"""
+import sys
+import timeit
+
+from flask import Flask, jsonify
+
+from metrics import Registry, instrument
+
+
+def app_with(instrumented: bool) -> Flask:
+    """Builds a one-route app, optionally instrumented.
+    """
+    app = Flask(__name__)
+    if instrumented:
+        instrument(app, Registry())
+
+    @app.route('/')
+    def home() -> str:
+        return jsonify({"message": "Bienvenue"})
+
+    return app
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    registry = Registry()
+
+    def record() -> None:
+        registry.observe_request('/', 'GET', 200, 0.0012)
+        with registry.span('auth'):
+            pass
+
+    seconds = min(timeit.repeat(record, number=number, repeat=3))
+    print("observe_request + span: {:.2f}us".format(seconds / number * 1e6))
+
+    requests = max(1, number // 20)
+    clients = {flag: app_with(flag).test_client() for flag in (False, True)}
+    results = {False: float('inf'), True: float('inf')}
+    for _ in range(7):
+        for flag, client in clients.items():
+            seconds = timeit.timeit(lambda: client.get('/'), number=requests)
+            results[flag] = min(results[flag], seconds / requests)
+    print("GET / plain {:.1f}us  instrumented {:.1f}us  overhead {:.2f}us"
+          .format(results[False] * 1e6, results[True] * 1e6,
+                  (results[True] - results[False]) * 1e6))
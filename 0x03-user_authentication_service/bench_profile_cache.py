@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""GET /profile throughput with and without the session cache
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+EMAIL = "bench@holberton.io"
+PASSWD = "b4l0u"
+
+
+def run(app, session_id: str, concurrency: int, requests: int) -> float:
+    """
+    Sends `requests` GET /profile from `concurrency` threads.
+
+    Returns:
+        float: The number of 200 responses per second.
+    """
+    def fetch(_) -> int:
+        client = app.test_client()
+        client.set_cookie('session_id', session_id)
+        return client.get('/profile').status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        codes = list(pool.map(fetch, range(requests)))
+    return codes.count(200) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_URL'] = "sqlite:///" + os.path.join(tmp, "p.db")
+        from app import app, AUTH
+        from cache import SessionCache
+        AUTH.register_user(EMAIL, PASSWD)
+        session_id = AUTH.login(EMAIL, PASSWD)
+        for label, max_size in (('uncached', 0), ('cached', 10000)):
+            AUTH._sessions = SessionCache(max_size=max_size)
+            print("{:<9} {:>9.1f} req/s  {}".format(
+                label, run(app, session_id, concurrency, requests),
+                AUTH.session_cache_stats()))
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Per-request cost of the sampling profiler
+
+Times GET / through the Flask test client without a profiler, with a
+profiler at rate 0, and at rates 0.01 and 1, alternating between them
+and keeping the best run of each.
+"""
+import sys
+import timeit
+
+from flask import Flask, jsonify
+
+from profiling import Profiler
+
+
+def app_with(rate: float = None) -> Flask:
+    """Builds a one-route app, with a profiler attached unless rate is None.
+    """
+    app = Flask(__name__)
+    if rate is not None:
+        Profiler(rate=rate).attach(app)
+
+    @app.route('/')
+    def home() -> str:
+        return jsonify({"message": "Bienvenue"})
+
+    return app
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rates = (None, 0, 0.01, 1)
+    clients = {rate: app_with(rate).test_client() for rate in rates}
+    results = dict.fromkeys(rates, float('inf'))
+    for _ in range(7):
+        for rate, client in clients.items():
+            seconds = timeit.timeit(lambda: client.get('/'), number=requests)
+            results[rate] = min(results[rate], seconds / requests)
+    for rate in rates:
+        label = "no profiler" if rate is None else "rate {}".format(rate)
+        print("{:<12} {:8.1f}us".format(label, results[rate] * 1e6))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Per-endpoint SQL query counts with regression budgets
+
+Runs each route once through the Flask test client against a scratch
+SQLite file and fails if any endpoint issues more statements than its
+budget.
+"""
+import os
+import sys
+import tempfile
+
+from sqlalchemy import event
+
+BUDGETS = {
+    'POST /users': 2,
+    'POST /sessions': 2,
+    'GET /profile': 1,
+    'DELETE /sessions': 2,
+    'POST /reset_password': 1,
+    'PUT /reset_password': 1,
+}
+EMAIL = "guillaume@holberton.io"
+PASSWD = "b4l0u"
+
+
+def count_queries(engine) -> list:
+    """Records every statement sent through an engine into a list.
+    """
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return statements
+
+
+def measure(app, statements: list) -> dict:
+    """Runs the auth flow once and returns the statement count per route.
+    """
+    client = app.test_client()
+    counts = {}
+
+    def call(name: str, **kwargs):
+        method, path = name.split(' ')
+        del statements[:]
+        response = client.open(path, method=method, **kwargs)
+        counts[name] = len(statements)
+        return response
+
+    call('POST /users', data={'email': EMAIL, 'password': PASSWD})
+    call('POST /sessions', data={'email': EMAIL, 'password': PASSWD})
+    call('GET /profile')
+    call('DELETE /sessions')
+    token = call('POST /reset_password',
+                 data={'email': EMAIL}).get_json()['reset_token']
+    call('PUT /reset_password', data={
+        'email': EMAIL, 'reset_token': token, 'new_password': PASSWD})
+    return counts
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DB_URL'] = "sqlite:///" + os.path.join(tmp, "q.db")
+        from app import app, AUTH
+        counts = measure(app, count_queries(AUTH._db._engine))
+    failed = False
+    for name, budget in BUDGETS.items():
+        status = "ok" if counts[name] <= budget else "OVER BUDGET"
+        failed = failed or counts[name] > budget
+        print("{:<22} {:>2} queries (budget {}) {}".format(
+            name, counts[name], budget, status))
+    sys.exit(1 if failed else 0)
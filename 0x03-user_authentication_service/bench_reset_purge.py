@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Throughput of the batched reset token purge
+
+Seeds a scratch SQLite file with users holding reset tokens, half of
+them expired, then times DB.purge_expired_reset_tokens per batch size.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from db import DB
+from user import User
+
+CHUNK = 50000
+
+
+def seed(db: DB, rows: int) -> None:
+    """Inserts `rows` users with a reset token, every other one expired.
+    """
+    now = datetime.utcnow()
+    live, expired = now + timedelta(hours=1), now - timedelta(hours=1)
+    with db._engine.begin() as connection:
+        for start in range(0, rows, CHUNK):
+            connection.execute(insert(User), [{
+                'email': 'user{}@holberton.io'.format(i),
+                'hashed_password': 'x',
+                'reset_token': 'reset-{}'.format(i),
+                'reset_token_expires_at': expired if i % 2 else live,
+            } for i in range(start, min(rows, start + CHUNK))])
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for batch_size in (1000, 10000):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB("sqlite:///" + os.path.join(tmp, "r.db"),
+                    persistent=True)
+            seed(db, rows)
+            start = time.perf_counter()
+            purged = db.purge_expired_reset_tokens(batch_size)
+            elapsed = time.perf_counter() - start
+            print("batch {:>6}: purged {:,} tokens at {:,.0f} rows/s"
+                  .format(batch_size, purged, purged / elapsed))
+            db.close_session()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Session lookup latency with many sessions per user
+
+Seeds a scratch SQLite file with users holding many sessions each, a
+quarter of them expired, then times DB.find_user_by_session and the
+batched purge of expired sessions.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from db import DB
+from user import User, UserSession
+
+
+def seed(db: DB, users: int, sessions_per_user: int) -> None:
+    """Inserts the users and their sessions.
+    """
+    now = datetime.utcnow()
+    live, expired = now + timedelta(days=1), now - timedelta(days=1)
+    with db._engine.begin() as connection:
+        connection.execute(insert(User), [{
+            'id': u + 1,
+            'email': 'user{}@holberton.io'.format(u),
+            'hashed_password': 'x',
+        } for u in range(users)])
+        for u in range(users):
+            connection.execute(insert(UserSession), [{
+                'token': 'token-{}-{}'.format(u, s),
+                'user_id': u + 1,
+                'created_at': now,
+                'expires_at': expired if s % 4 == 0 else live,
+            } for s in range(sessions_per_user)])
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    lookups = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB("sqlite:///" + os.path.join(tmp, "s.db"), persistent=True)
+        seed(db, users, per_user)
+        samples = []
+        for _ in range(lookups):
+            token = 'token-{}-{}'.format(
+                random.randrange(users), random.randrange(1, per_user))
+            start = time.perf_counter()
+            try:
+                db.find_user_by_session(token)
+            except Exception:
+                pass
+            samples.append((time.perf_counter() - start) * 1e6)
+            db._session.expunge_all()
+        samples.sort()
+        print("{:,} sessions: lookup p50 {:.1f}us  p99 {:.1f}us".format(
+            users * per_user, samples[len(samples) // 2],
+            samples[int(len(samples) * 0.99)]))
+        start = time.perf_counter()
+        purged = db.purge_expired_sessions(5000)
+        elapsed = time.perf_counter() - start
+        print("purged {:,} expired sessions at {:,.0f} rows/s".format(
+            purged, purged / elapsed))
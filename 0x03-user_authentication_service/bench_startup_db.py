@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Startup time of DB() on a populated database
+
+Measures, in fresh interpreters, how long DB() takes on a populated
+SQLite file in persistent mode (create missing tables, apply pending
+migrations) and in the default reset mode (drop and recreate).
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import insert
+
+from db import DB
+from user import User
+
+PROBE = """
+import time
+start = time.perf_counter()
+from db import DB
+DB({url!r}, persistent={persistent})
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(url: str, persistent: bool, runs: int) -> float:
+    """Returns the best DB() startup time over `runs` fresh interpreters.
+    """
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            PROBE.format(url=url, persistent=persistent),
+        ])
+        times.append(float(output))
+    return min(times)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        url = "sqlite:///" + os.path.join(tmp, "startup.db")
+        db = DB(url, persistent=True)
+        with db._engine.begin() as connection:
+            connection.execute(insert(User), [{
+                'email': 'user{}@holberton.io'.format(i),
+                'hashed_password': 'x',
+            } for i in range(rows)])
+        print("persistent: {:.1f} ms".format(
+            1000 * cold_start(url, True, runs)))
+        print("reset:      {:.1f} ms".format(
+            1000 * cold_start(url, False, 1)))
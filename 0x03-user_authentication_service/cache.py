@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""In-process cache of session lookups
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from time import monotonic
+from typing import Union
+
+UserSnapshot = namedtuple('UserSnapshot', ['id', 'email'])
+
+
+class SessionCache:
+    """Bounded LRU cache mapping a session ID to a UserSnapshot.
+
+    Entries live at most ``ttl`` seconds. Invalidation is synchronous
+    but local to the process, so with several workers the TTL bounds how
+    long another worker may serve a stale entry. A ``max_size`` of 0
+    disables the cache.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None) -> None:
+        """Initializes the cache, defaulting to the environment settings.
+        """
+        if max_size is None:
+            max_size = int(os.getenv('SESSION_CACHE_SIZE', '10000'))
+        if ttl is None:
+            ttl = float(os.getenv('SESSION_CACHE_TTL', '30'))
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._session_ids_by_user_id = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every invalidation.
+
+        Read it before a database lookup and pass it to put, so a lookup
+        that raced with an invalidation is not cached.
+        """
+        return self._generation
+
+    def get(self, session_id: str) -> Union[UserSnapshot, None]:
+        """Returns the cached user of a session, if fresh.
+        """
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self._misses += 1
+                return None
+            snapshot, expires_at = entry
+            if expires_at < monotonic():
+                self._expirations += 1
+                self._misses += 1
+                self._forget(session_id)
+                return None
+            self._entries.move_to_end(session_id)
+            self._hits += 1
+            return snapshot
+
+    def put(self, session_id: str, snapshot: UserSnapshot,
+            generation: int) -> None:
+        """Caches the user of a session looked up at a given generation.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._forget(session_id)
+            self._entries[session_id] = (snapshot, monotonic() + self.ttl)
+            self._session_ids_by_user_id.setdefault(
+                snapshot.id, set()).add(session_id)
+            while len(self._entries) > self.max_size:
+                self._forget(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drops every cached session of a user.
+        """
+        with self._lock:
+            self._generation += 1
+            for session_id in self._session_ids_by_user_id.pop(user_id, ()):
+                self._entries.pop(session_id, None)
+
+    def _forget(self, session_id: str) -> None:
+        """Removes one entry and its reverse index. Caller holds the lock.
+        """
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        session_ids = self._session_ids_by_user_id.get(entry[0].id)
+        if session_ids is not None:
+            session_ids.discard(session_id)
+            if len(session_ids) == 0:
+                del self._session_ids_by_user_id[entry[0].id]
+
+    def stats(self) -> dict:
+        """Returns the cache counters.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Periodic cleanup of expired rows
+
+Usage: ./cleanup.py [interval_seconds] [batch_size]
+Runs once when interval_seconds is 0 (the default).
+"""
+import sys
+import time
+
+from db import DB
+
+
+def purge(db: DB, batch_size: int) -> None:
+    """Purges expired rows once and reports the throughput.
+    """
+    start = time.perf_counter()
+    sessions = db.purge_expired_sessions(batch_size)
+    reset_tokens = db.purge_expired_reset_tokens(batch_size)
+    db.close_session()
+    print("purged {} sessions and {} reset tokens in {:.3f}s".format(
+        sessions, reset_tokens, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else 0
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    db = DB(persistent=True)
+    while True:
+        purge(db, batch_size)
+        if interval <= 0:
+            break
+        time.sleep(interval)
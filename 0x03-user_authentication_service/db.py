@@ -1,36 +1,200 @@
 #!/usr/bin/env python3
 """DB module.
 """
-from sqlalchemy import create_engine, tuple_
+import os
+import threading
+
+from datetime import datetime
+from time import perf_counter
+from typing import Union
+
+from sqlalchemy import (Column, Integer, Table, create_engine, delete, event,
+                        insert, inspect, literal, or_, select, text, update)
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import StaticPool
+
+from metrics import REGISTRY
+from user import Base, User, UserSession
+
+DEFAULT_URL = "sqlite:///a.db"
+SCHEMA_VERSION = 4
+
+
+def _create_index(name: str):
+    """Migration step creating an index of the models, if missing, in the
+    DDL of the connection's dialect.
+    """
+    def step(connection) -> None:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name == name:
+                    index.create(connection, checkfirst=True)
+    return step
+
+
+def _add_column(table: str, column: str):
+    """Migration step adding a column of the models to an existing table,
+    with the column type of the connection's dialect.
+    """
+    def step(connection) -> None:
+        column_type = Base.metadata.tables[table].c[column].type.compile(
+            dialect=connection.dialect)
+        connection.execute(text("ALTER TABLE {} ADD COLUMN {} {}".format(
+            table, column, column_type)))
+    return step
+
+
+# Steps upgrading an existing database to each version: portable SQL, or
+# callables generating the DDL for the connection's dialect. New tables
+# come from create_all; these only alter tables that already exist.
+MIGRATIONS = {
+    2: (
+        _create_index("ix_users_email"),
+        _create_index("ix_users_session_id"),
+        _create_index("ix_users_reset_token"),
+    ),
+    3: (
+        "INSERT INTO sessions (token, user_id, created_at) "
+        "SELECT session_id, id, CURRENT_TIMESTAMP FROM users "
+        "WHERE session_id IS NOT NULL",
+        "UPDATE users SET session_id = NULL",
+    ),
+    4: (
+        _add_column("users", "reset_token_expires_at"),
+        _create_index("ix_users_reset_token_expires_at"),
+        # Tokens issued before expiry existed are dropped, not grandfathered
+        "UPDATE users SET reset_token = NULL",
+    ),
+}
 
-from user import Base, User
+schema_version = Table(
+    'schema_version', Base.metadata,
+    Column('version', Integer, nullable=False),
+)
+
+_engines = {}
+_ready_urls = set()
+_setup_lock = threading.Lock()
+
+
+def _engine_for(url: str) -> Engine:
+    """Returns the process-wide engine of a database URL.
+
+    The caller holds _setup_lock, so that concurrent callers share one
+    engine and pool.
+    """
+    if url not in _engines:
+        options = {"echo": False}
+        parsed = make_url(url)
+        if parsed.get_backend_name() == "sqlite":
+            options["connect_args"] = {"check_same_thread": False}
+        if parsed.get_backend_name() == "sqlite" and \
+                parsed.database in (None, "", ":memory:"):
+            # An in-memory database lives in a single connection, which
+            # every thread must share to see the same tables
+            options["poolclass"] = StaticPool
+        else:
+            options["pool_size"] = int(os.getenv('DB_POOL_SIZE', '5'))
+            options["max_overflow"] = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+            options["pool_timeout"] = float(
+                os.getenv('DB_POOL_TIMEOUT', '30'))
+        _engines[url] = create_engine(url, **options)
+        _time_statements(_engines[url])
+    return _engines[url]
+
+
+def _time_statements(engine: Engine) -> None:
+    """Records each statement as a store_lookup or store_write span.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context,
+                    executemany):
+        conn.info['statement_start'] = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info['statement_start']
+        is_read = statement.lstrip()[:6].upper() == 'SELECT'
+        REGISTRY.observe_span(
+            'store_lookup' if is_read else 'store_write', elapsed)
+
+
+def _upgrade_schema(engine: Engine) -> None:
+    """Creates missing tables and applies pending migrations.
+    """
+    existing = inspect(engine).has_table(User.__tablename__)
+    with engine.begin() as connection:
+        current = SCHEMA_VERSION
+        if existing:
+            current = 1
+            if inspect(connection).has_table(schema_version.name):
+                current = connection.execute(
+                    select(schema_version.c.version)).scalar() or 1
+        Base.metadata.create_all(connection)
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            for statement in MIGRATIONS.get(version, ()):
+                if callable(statement):
+                    statement(connection)
+                else:
+                    connection.execute(text(statement))
+        _stamp_version(connection)
+
+
+def _stamp_version(connection) -> None:
+    """Records that the schema is at SCHEMA_VERSION.
+    """
+    connection.execute(schema_version.delete())
+    connection.execute(
+        schema_version.insert().values(version=SCHEMA_VERSION))
 
 
 class DB:
     """DB class.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, url: str = None, persistent: bool = None) -> None:
         """Initialize a new DB instance.
+
+        The database URL defaults to DB_URL. Unless persistent (or
+        DB_PERSISTENT is set), the tables are dropped and recreated.
+        A persistent database only gets its missing tables and pending
+        migrations, once per process.
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        if url is None:
+            url = os.getenv('DB_URL', DEFAULT_URL)
+        if persistent is None:
+            persistent = os.getenv('DB_PERSISTENT', '').lower() in (
+                '1', 'true', 'yes')
+        with _setup_lock:
+            self._engine = _engine_for(url)
+            if not persistent:
+                Base.metadata.drop_all(self._engine)
+                with self._engine.begin() as connection:
+                    Base.metadata.create_all(connection)
+                    _stamp_version(connection)
+                _ready_urls.discard(url)
+            elif url not in _ready_urls:
+                _upgrade_schema(self._engine)
+                _ready_urls.add(url)
+        self.__session = scoped_session(
+            sessionmaker(bind=self._engine, expire_on_commit=False))
 
     @property
     def _session(self) -> Session:
-        """Memoized session object.
+        """Session object of the calling thread.
+        """
+        return self.__session()
+
+    def close_session(self) -> None:
+        """Closes the calling thread's session and returns its connection
+        to the pool.
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """Adds a new user to the database.
@@ -44,37 +208,237 @@ class DB:
             new_user = None
         return new_user
 
-    def find_user_by(self, **kwargs) -> User:
-        """Finds a user based on a set of filters.
+    def _criteria(self, filters: dict) -> list:
+        """Builds equality predicates on User columns.
         """
-        fields, values = [], []
-        for key, value in kwargs.items():
+        criteria = []
+        for key, value in filters.items():
             if hasattr(User, key):
-                fields.append(getattr(User, key))
-                values.append(value)
+                criteria.append(getattr(User, key) == value)
             else:
                 raise InvalidRequestError()
-        result = self._session.query(User).filter(
-            tuple_(*fields).in_([tuple(values)])
-        ).first()
+        return criteria
+
+    def find_user_by(self, **kwargs) -> User:
+        """Finds a user based on a set of filters.
+        """
+        criteria = self._criteria(kwargs)
+        # NULL never equals anything, so a None filter cannot match
+        if None in kwargs.values():
+            raise NoResultFound()
+        result = self._session.query(User).filter(*criteria).first()
         if result is None:
             raise NoResultFound()
         return result
 
-    def update_user(self, user_id: int, **kwargs) -> None:
-        """Updates a user based on a given id.
+    def update_user_where(self, filters: dict, **kwargs) -> Union[int, None]:
+        """Updates the user matching a set of filters in one statement.
+
+        Returns the id of the updated user, or None if no user matched.
+        The id comes back through RETURNING when the dialect supports it.
+        """
+        criteria = self._criteria(filters)
+        update_source = self._values(kwargs)
+        if None in filters.values():
+            return None
+        return self._update_returning_id(criteria, update_source)
+
+    def _values(self, kwargs: dict) -> dict:
+        """Maps attribute names to User columns for an UPDATE.
         """
-        user = self.find_user_by(id=user_id)
-        if user is None:
-            return
         update_source = {}
         for key, value in kwargs.items():
             if hasattr(User, key):
                 update_source[getattr(User, key)] = value
             else:
                 raise ValueError()
-        self._session.query(User).filter(User.id == user_id).update(
-            update_source,
-            synchronize_session=False,
+        return update_source
+
+    def _update_returning_id(self, criteria: list,
+                             update_source: dict) -> Union[int, None]:
+        """Runs one UPDATE on the user matching criteria and returns the
+        user's id, or None if no user matched.
+        """
+        statement = update(User).values(update_source).execution_options(
+            synchronize_session=False)
+        try:
+            if self._engine.dialect.update_returning:
+                user_id = self._session.execute(
+                    statement.where(*criteria).returning(User.id)).scalar()
+            else:
+                user_id = self._session.execute(
+                    select(User.id).where(*criteria).with_for_update()
+                ).scalar()
+                if user_id is not None:
+                    self._session.execute(
+                        statement.where(User.id == user_id))
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+        return user_id
+
+    def update_user(self, user_id: int, **kwargs) -> None:
+        """Updates a user based on a given id.
+        """
+        if self.update_user_where({'id': user_id}, **kwargs) is None:
+            raise NoResultFound()
+
+    def set_reset_token_by_email(
+            self, email: str, reset_token: str,
+            expires_at: datetime) -> Union[int, None]:
+        """Sets the reset token of the user with a given email.
+        """
+        return self.update_user_where(
+            {'email': email},
+            reset_token=reset_token,
+            reset_token_expires_at=expires_at,
         )
-        self._session.commit()
+
+    def _reset_token_criteria(self, reset_token: str) -> list:
+        """Predicates matching the user holding an unexpired reset token.
+        """
+        return [User.reset_token == reset_token,
+                User.reset_token_expires_at > datetime.utcnow()]
+
+    def has_reset_token(self, reset_token: str) -> bool:
+        """Tells whether a user holds an unexpired reset token, with one
+        indexed SELECT.
+        """
+        if reset_token is None:
+            return False
+        return self._session.execute(
+            select(User.id).where(
+                *self._reset_token_criteria(reset_token)).limit(1)
+        ).scalar() is not None
+
+    def consume_reset_token(self, reset_token: str,
+                            hashed_password: bytes) -> Union[int, None]:
+        """Replaces the password of the user holding an unexpired reset
+        token and clears the token, in one statement.
+        """
+        if reset_token is None:
+            return None
+        return self._update_returning_id(
+            self._reset_token_criteria(reset_token),
+            self._values({
+                'hashed_password': hashed_password,
+                'reset_token': None,
+                'reset_token_expires_at': None,
+            }),
+        )
+
+    def purge_expired_reset_tokens(self, batch_size: int = 1000) -> int:
+        """Clears expired reset tokens, committing every batch_size rows.
+
+        Returns the number of cleared tokens.
+        """
+        total = 0
+        while True:
+            expired = select(User.id).where(
+                User.reset_token_expires_at < datetime.utcnow()
+            ).limit(batch_size)
+            try:
+                count = self._session.execute(
+                    update(User).where(User.id.in_(expired)).values(
+                        reset_token=None, reset_token_expires_at=None,
+                    ).execution_options(synchronize_session=False)
+                ).rowcount
+                self._session.commit()
+            except Exception:
+                self._session.rollback()
+                raise
+            total += count
+            if count < batch_size:
+                return total
+
+    def create_session_where(self, filters: dict, token: str,
+                             expires_at: datetime = None) -> Union[int, None]:
+        """Opens a session for the user matching a set of filters in one
+        INSERT ... SELECT statement.
+
+        Returns the id of the user, or None if no user matched.
+        """
+        criteria = self._criteria(filters)
+        if None in filters.values():
+            return None
+        source = select(
+            literal(token), User.id, literal(datetime.utcnow()),
+            literal(expires_at, UserSession.expires_at.type),
+        ).where(*criteria)
+        statement = insert(UserSession).from_select(
+            ['token', 'user_id', 'created_at', 'expires_at'], source)
+        try:
+            if self._engine.dialect.insert_returning:
+                user_id = self._session.execute(
+                    statement.returning(UserSession.user_id)).scalar()
+            else:
+                user_id = None
+                if self._session.execute(statement).rowcount > 0:
+                    user_id = self._session.execute(
+                        select(UserSession.user_id).where(
+                            UserSession.token == token)).scalar()
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+        return user_id
+
+    def find_user_by_session(self, token: str) -> User:
+        """Finds the user owning an unexpired session.
+        """
+        if token is None:
+            raise NoResultFound()
+        result = self._session.query(User).join(
+            UserSession, UserSession.user_id == User.id,
+        ).filter(
+            UserSession.token == token,
+            or_(UserSession.expires_at.is_(None),
+                UserSession.expires_at > datetime.utcnow()),
+        ).first()
+        if result is None:
+            raise NoResultFound()
+        return result
+
+    def delete_sessions(self, user_id: int, token: str = None) -> int:
+        """Deletes one session of a user, or all of them without a token.
+
+        Returns the number of deleted sessions.
+        """
+        statement = delete(UserSession).where(
+            UserSession.user_id == user_id,
+        ).execution_options(synchronize_session=False)
+        if token is not None:
+            statement = statement.where(UserSession.token == token)
+        try:
+            count = self._session.execute(statement).rowcount
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+        return count
+
+    def purge_expired_sessions(self, batch_size: int = 1000) -> int:
+        """Deletes expired sessions, committing every batch_size rows so
+        that no single transaction holds the write lock for long.
+
+        Returns the number of deleted sessions.
+        """
+        total = 0
+        while True:
+            expired = select(UserSession.id).where(
+                UserSession.expires_at < datetime.utcnow()
+            ).limit(batch_size)
+            try:
+                count = self._session.execute(
+                    delete(UserSession).where(
+                        UserSession.id.in_(expired),
+                    ).execution_options(synchronize_session=False)
+                ).rowcount
+                self._session.commit()
+            except Exception:
+                self._session.rollback()
+                raise
+            total += count
+            if count < batch_size:
+                return total
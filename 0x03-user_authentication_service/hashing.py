@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Password hashing on a worker pool
+"""
+import os
+import re
+import threading
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+from admission import Overloaded, PasswordGate
+from metrics import span
+
+_EXECUTORS = {}
+_EXECUTORS_LOCK = threading.Lock()
+# $2a$, $2b$ or $2y$, a two-digit cost, then 22 characters of salt and 31
+# of hash in bcrypt's base64 alphabet: 60 bytes in all
+BCRYPT_HASH = re.compile(rb'\$2[aby]\$[0-9]{2}\$[./A-Za-z0-9]{53}')
+
+
+def hash_password(password: bytes) -> bytes:
+    """Hashes an encoded password with a fresh salt.
+    """
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+
+def is_bcrypt_hash(hashed_password: bytes) -> bool:
+    """Tells whether a value is a well-formed bcrypt hash.
+    """
+    return isinstance(hashed_password, bytes) and \
+        BCRYPT_HASH.fullmatch(hashed_password) is not None
+
+
+def check_password(password: bytes, hashed_password: bytes) -> bool:
+    """Checks an encoded password against a bcrypt hash.
+
+    A malformed hash never matches, rather than raising.
+    """
+    if not is_bcrypt_hash(hashed_password):
+        return False
+    try:
+        return bcrypt.checkpw(password, hashed_password)
+    except ValueError:
+        return False
+
+
+def _shared_executor(kind: str, workers: int) -> Executor:
+    """Returns the process-wide executor for a pool kind and size.
+    """
+    key = (kind, workers)
+    with _EXECUTORS_LOCK:
+        if key not in _EXECUTORS:
+            if kind == 'process':
+                _EXECUTORS[key] = ProcessPoolExecutor(max_workers=workers)
+            else:
+                _EXECUTORS[key] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='bcrypt')
+        return _EXECUTORS[key]
+
+
+class PasswordHasher:
+    """Runs bcrypt on a thread or process pool behind a PasswordGate.
+
+    ``BCRYPT_EXECUTOR`` selects ``thread`` (bcrypt releases the GIL),
+    ``process`` or ``inline``. ``BCRYPT_WORKERS`` sets the pool size and
+    ``BCRYPT_TIMEOUT`` how many seconds a caller waits for its result.
+    The gate slot is held until the worker finishes, so a caller that
+    times out does not let more work onto an already busy pool.
+    """
+
+    def __init__(self, kind: str = None, workers: int = None,
+                 timeout: float = None, gate: PasswordGate = None) -> None:
+        """Initializes the hasher, defaulting to the environment settings.
+        """
+        if kind is None:
+            kind = os.getenv('BCRYPT_EXECUTOR', 'thread')
+        if workers is None:
+            workers = int(os.getenv('BCRYPT_WORKERS', os.cpu_count() or 1))
+        if timeout is None:
+            timeout = float(os.getenv('BCRYPT_TIMEOUT', '5'))
+        self.kind = kind
+        self.timeout = timeout
+        self.gate = gate if gate is not None else PasswordGate()
+        self._executor = None
+        if kind != 'inline':
+            self._executor = _shared_executor(kind, max(1, workers))
+
+    def _run(self, fn, *args):
+        """Runs fn on the pool and waits for its result.
+        """
+        self.gate.acquire()
+        if self._executor is None:
+            try:
+                return fn(*args)
+            finally:
+                self.gate.release()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self.gate.release()
+            raise
+        future.add_done_callback(lambda f: self.gate.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise Overloaded()
+
+    def hash(self, password: str) -> bytes:
+        """Hashes a password.
+        """
+        with span('password_hash'):
+            return self._run(hash_password, password.encode("utf-8"))
+
+    def check(self, password: str, hashed_password: bytes) -> bool:
+        """Checks a password against its hash.
+        """
+        with span('password_hash'):
+            return self._run(
+                check_password, password.encode("utf-8"), hashed_password)
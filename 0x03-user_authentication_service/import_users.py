@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Bulk user import for the authentication service
+
+Usage: ./import_users.py users.csv [--format jsonl] [--chunk-size 1000]
+
+Each row has an ``email`` and either a plain ``password`` (hashed with
+bcrypt on a process pool) or a bcrypt ``hashed_password`` stored as-is.
+Rows without an email or a password, or whose ``hashed_password`` is not
+a well-formed bcrypt hash, are rejected and counted. Emails already in
+the database, or repeated in the input, are skipped.
+Rows are inserted with one executemany per chunk, each chunk in its own
+transaction. The number of rows handled is saved to a checkpoint file
+after each chunk, so an interrupted import resumes where it stopped.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator, Tuple
+
+from sqlalchemy import insert, select
+
+from db import DB
+from hashing import hash_password, is_bcrypt_hash
+from user import User
+
+
+def read_rows(path: str, fmt: str) -> Iterator[dict]:
+    """Yields the rows of a CSV or JSON-lines file as dicts.
+    """
+    with open(path, newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_checkpoint(path: str) -> int:
+    """Returns the number of rows already handled.
+    """
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path: str, done: int) -> None:
+    """Atomically records the number of rows handled.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(str(done))
+    os.replace(tmp_path, path)
+
+
+def existing_emails(connection, emails: list) -> set:
+    """Returns which of the emails are already registered.
+    """
+    if not emails:
+        return set()
+    return set(connection.execute(
+        select(User.email).where(User.email.in_(emails))).scalars())
+
+
+def is_valid_row(row: dict) -> bool:
+    """Tells whether a row has an email and a usable password or hash.
+    """
+    if not (row.get('email') or '').strip():
+        return False
+    if row.get('hashed_password'):
+        return is_bcrypt_hash(row['hashed_password'].encode('utf-8'))
+    return bool(row.get('password'))
+
+
+def import_chunk(db: DB, pool: ProcessPoolExecutor,
+                 rows: list) -> Tuple[int, int]:
+    """Inserts the new users of a chunk.
+
+    Returns:
+        tuple: The number of inserted users and of rejected rows.
+    """
+    by_email = {}
+    rejected = 0
+    for row in rows:
+        if not is_valid_row(row):
+            rejected += 1
+            continue
+        email = row['email'].strip()
+        if email not in by_email:
+            by_email[email] = row
+    with db._engine.connect() as connection:
+        known = existing_emails(connection, list(by_email))
+    new = [(email, row) for email, row in by_email.items()
+           if email not in known]
+    plain = [(email, row['password']) for email, row in new
+             if not row.get('hashed_password')]
+    hashed = dict(zip(
+        [email for email, _ in plain],
+        pool.map(hash_password,
+                 [password.encode('utf-8') for _, password in plain],
+                 chunksize=16),
+    ))
+    with db._engine.begin() as connection:
+        # Re-check inside the write transaction: hashing took a while
+        known = existing_emails(connection, [email for email, _ in new])
+        records = [{
+            'email': email,
+            'hashed_password': hashed.get(email) or
+            row['hashed_password'].encode('utf-8'),
+        } for email, row in new if email not in known]
+        if records:
+            connection.execute(insert(User), records)
+    return len(records), rejected
+
+
+def main() -> None:
+    """Runs the import.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'jsonl'))
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--checkpoint')
+    args = parser.parse_args()
+    fmt = args.format or (
+        'jsonl' if args.path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    checkpoint = args.checkpoint or args.path + '.checkpoint'
+
+    db = DB(persistent=True)
+    done = read_checkpoint(checkpoint)
+    rows = islice(read_rows(args.path, fmt), done, None)
+    inserted, rejected, start = 0, 0, time.perf_counter()
+    if done:
+        print("resuming after {:,} rows".format(done), file=sys.stderr)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        while True:
+            chunk = list(islice(rows, args.chunk_size))
+            if not chunk:
+                break
+            chunk_inserted, chunk_rejected = import_chunk(db, pool, chunk)
+            inserted += chunk_inserted
+            rejected += chunk_rejected
+            done += len(chunk)
+            write_checkpoint(checkpoint, done)
+            elapsed = time.perf_counter() - start
+            print("{:,} rows read, {:,} inserted, {:,} rejected, "
+                  "{:,.0f} rows/s".format(done, inserted, rejected,
+                                          inserted / elapsed),
+                  file=sys.stderr)
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,147 +1,527 @@
 #!/usr/bin/env python3
-"""End-to-end integration test
+"""End-to-end integration test and load-generation harness
+
+Without arguments, runs the register -> login -> profile -> reset ->
+logout flow once against http://localhost:5000 and asserts every
+response. With --users, runs the same flow for N virtual users at a
+given concurrency and reports per-endpoint throughput and latency
+percentiles as JSON. --target flask drives the app in-process through
+the Flask test client, so runs are reproducible offline.
+
+All virtual users share one client address, so a server under load test
+must run with its login limiters off (LOGIN_CLIENT_RATE=0 and
+LOGIN_EMAIL_RATE=0), and with a password gate queue deep enough for the
+concurrency (BCRYPT_MAX_QUEUE, BCRYPT_QUEUE_TIMEOUT); --target flask
+does this itself. 429 (rate-limited) and 503 (overloaded) responses are
+counted apart from errors and left out of the latencies, and a warning
+is printed when there are any.
 """
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
 import requests
 
+BASE_URL = "http://localhost:5000"
+# Responses shedding load rather than reporting on the endpoint
+SHED_STATUSES = {429: "rate_limited", 503: "overloaded"}
+
+Result = namedtuple('Result', ['status_code', 'payload', 'session_id'])
+
+
+class HttpClient:
+    """Sends requests to a running server.
+    """
+
+    def __init__(self, base_url: str = BASE_URL) -> None:
+        """
+        Args:
+            base_url (str): The server's URL.
+        """
+        self.base_url = base_url.rstrip('/')
+        self._session = requests.Session()
+
+    def request(self, method: str, path: str, data: dict = None,
+                session_id: str = None) -> Result:
+        """
+        Sends one request, following redirects.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The route.
+            data (dict): The form fields.
+            session_id (str): The session cookie to send, if any.
+
+        Returns:
+            Result: The status, JSON payload and new session cookie.
+        """
+        cookies = {'session_id': session_id} if session_id else None
+        response = self._session.request(
+            method, self.base_url + path, data=data, cookies=cookies)
+        self._session.cookies.clear()
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        return Result(response.status_code, payload,
+                      response.cookies.get('session_id'))
+
 
-def register_user(email: str, password: str) -> None:
+class FlaskClient:
+    """Sends requests to the app in-process through the Flask test client.
+    """
+
+    def __init__(self, app) -> None:
+        """
+        Args:
+            app (Flask): The application under test.
+        """
+        self._client = app.test_client(use_cookies=False)
+
+    def request(self, method: str, path: str, data: dict = None,
+                session_id: str = None) -> Result:
+        """
+        Sends one request, following redirects.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The route.
+            data (dict): The form fields.
+            session_id (str): The session cookie to send, if any.
+
+        Returns:
+            Result: The status, JSON payload and new session cookie.
+        """
+        headers = {'Cookie': 'session_id=' + session_id} \
+            if session_id else None
+        response = self._client.open(path, method=method, data=data,
+                                     headers=headers, follow_redirects=True)
+        new_session_id = None
+        for header in response.headers.getlist('Set-Cookie'):
+            cookie = SimpleCookie(header)
+            if 'session_id' in cookie:
+                new_session_id = cookie['session_id'].value
+        return Result(response.status_code, response.get_json(silent=True),
+                      new_session_id)
+
+
+CLIENT = HttpClient()
+
+
+def register_user(email: str, password: str, client=None) -> None:
     """
     Register a new user.
-    
+
     Args:
         email (str): The user's email.
         password (str): The user's password.
-    
+        client: The client to use, the local server by default.
+
     Raises:
-        AssertionError: If the registration fails or returns unexpected response.
+        AssertionError: If the registration fails or returns unexpected
+            response.
     """
-    response = requests.post('http://localhost:5000/users', data={'email': email, 'password': password})
-    assert response.status_code == 200, f"Failed to register user. Status code: {response.status_code}"
-    assert response.json() == {"email": email, "message": "user created"}, "Unexpected response payload"
+    response = (client or CLIENT).request(
+        'POST', '/users', data={'email': email, 'password': password})
+    assert response.status_code == 200, \
+        f"Failed to register user. Status code: {response.status_code}"
+    assert response.payload == {"email": email, "message": "user created"}, \
+        "Unexpected response payload"
 
 
-def log_in_wrong_password(email: str, password: str) -> None:
+def log_in_wrong_password(email: str, password: str, client=None) -> None:
     """
     Attempt to log in with a wrong password.
-    
+
     Args:
         email (str): The user's email.
         password (str): An incorrect password.
-    
+        client: The client to use, the local server by default.
+
     Raises:
         AssertionError: If the login doesn't fail as expected.
     """
-    response = requests.post('http://localhost:5000/sessions', data={'email': email, 'password': password})
-    assert response.status_code == 401, f"Expected 401, got {response.status_code}"
+    response = (client or CLIENT).request(
+        'POST', '/sessions', data={'email': email, 'password': password})
+    assert response.status_code == 401, \
+        f"Expected 401, got {response.status_code}"
 
 
-def log_in(email: str, password: str) -> str:
+def log_in(email: str, password: str, client=None) -> str:
     """
     Log in a user.
-    
+
     Args:
         email (str): The user's email.
         password (str): The user's password.
-    
+        client: The client to use, the local server by default.
+
     Returns:
         str: The session ID for the logged-in user.
-    
+
     Raises:
         AssertionError: If the login fails or returns unexpected response.
     """
-    response = requests.post('http://localhost:5000/sessions', data={'email': email, 'password': password})
-    assert response.status_code == 200, f"Failed to log in. Status code: {response.status_code}"
-    assert 'session_id' in response.json(), "No session_id in response"
-    return response.json()['session_id']
+    response = (client or CLIENT).request(
+        'POST', '/sessions', data={'email': email, 'password': password})
+    assert response.status_code == 200, \
+        f"Failed to log in. Status code: {response.status_code}"
+    assert response.payload == {"email": email, "message": "logged in"}, \
+        "Unexpected response payload"
+    assert response.session_id is not None, "No session_id cookie"
+    return response.session_id
 
 
-def profile_unlogged() -> None:
+def profile_unlogged(client=None) -> None:
     """
     Attempt to access profile without being logged in.
-    
+
+    Args:
+        client: The client to use, the local server by default.
+
     Raises:
         AssertionError: If the request doesn't fail as expected.
     """
-    response = requests.get('http://localhost:5000/profile')
-    assert response.status_code == 403, f"Expected 403, got {response.status_code}"
+    response = (client or CLIENT).request('GET', '/profile')
+    assert response.status_code == 403, \
+        f"Expected 403, got {response.status_code}"
 
 
-def profile_logged(session_id: str) -> None:
+def profile_logged(session_id: str, client=None) -> None:
     """
     Access profile while logged in.
-    
+
     Args:
         session_id (str): The session ID of the logged-in user.
-    
+        client: The client to use, the local server by default.
+
     Raises:
-        AssertionError: If the profile access fails or returns unexpected response.
+        AssertionError: If the profile access fails or returns unexpected
+            response.
     """
-    response = requests.get('http://localhost:5000/profile', cookies={'session_id': session_id})
-    assert response.status_code == 200, f"Failed to get profile. Status code: {response.status_code}"
-    assert 'email' in response.json(), "No email in response"
+    response = (client or CLIENT).request(
+        'GET', '/profile', session_id=session_id)
+    assert response.status_code == 200, \
+        f"Failed to get profile. Status code: {response.status_code}"
+    assert 'email' in response.payload, "No email in response"
 
 
-def log_out(session_id: str) -> None:
+def log_out(session_id: str, client=None) -> None:
     """
     Log out a user.
-    
+
     Args:
         session_id (str): The session ID of the logged-in user.
-    
+        client: The client to use, the local server by default.
+
     Raises:
         AssertionError: If the logout fails or returns unexpected response.
     """
-    response = requests.delete('http://localhost:5000/sessions', cookies={'session_id': session_id})
-    assert response.status_code == 200, f"Failed to log out. Status code: {response.status_code}"
-    assert response.json() == {"message": "Bienvenue"}, "Unexpected response payload"
+    response = (client or CLIENT).request(
+        'DELETE', '/sessions', session_id=session_id)
+    assert response.status_code == 200, \
+        f"Failed to log out. Status code: {response.status_code}"
+    assert response.payload == {"message": "Bienvenue"}, \
+        "Unexpected response payload"
 
 
-def reset_password_token(email: str) -> str:
+def reset_password_token(email: str, client=None) -> str:
     """
     Request a password reset token.
-    
+
     Args:
         email (str): The email of the user requesting a password reset.
-    
+        client: The client to use, the local server by default.
+
     Returns:
         str: The reset token.
-    
+
     Raises:
         AssertionError: If the request fails or returns unexpected response.
     """
-    response = requests.post('http://localhost:5000/reset_password', data={'email': email})
-    assert response.status_code == 200, f"Failed to get reset token. Status code: {response.status_code}"
-    assert 'reset_token' in response.json(), "No reset_token in response"
-    return response.json()['reset_token']
+    response = (client or CLIENT).request(
+        'POST', '/reset_password', data={'email': email})
+    assert response.status_code == 200, \
+        f"Failed to get reset token. Status code: {response.status_code}"
+    assert 'reset_token' in response.payload, "No reset_token in response"
+    return response.payload['reset_token']
+
 
-def update_password(email: str, reset_token: str, new_password: str) -> None:
+def update_password(email: str, reset_token: str, new_password: str,
+                    client=None) -> None:
     """
     Update a user's password using a reset token.
-    
+
     Args:
         email (str): The user's email.
-        reset_token (str): The reset token obtained from reset_password_token().
+        reset_token (str): The reset token obtained from
+            reset_password_token().
         new_password (str): The new password to set.
-    
+        client: The client to use, the local server by default.
+
     Raises:
-        AssertionError: If the password update fails or returns unexpected response.
+        AssertionError: If the password update fails or returns unexpected
+            response.
+    """
+    response = (client or CLIENT).request('PUT', '/reset_password', data={
+        'email': email,
+        'reset_token': reset_token,
+        'new_password': new_password,
+    })
+    assert response.status_code == 200, \
+        f"Failed to update password. Status code: {response.status_code}"
+    assert response.payload == {"email": email,
+                                "message": "Password updated"}, \
+        "Unexpected response payload"
+
+
+def run_flow(client, email: str, password: str, new_password: str) -> None:
+    """
+    Run the whole flow once with assertions.
+
+    Args:
+        client: The client to use.
+        email (str): The user's email.
+        password (str): The user's password.
+        new_password (str): The password set through the reset flow.
+    """
+    register_user(email, password, client)
+    log_in_wrong_password(email, new_password, client)
+    profile_unlogged(client)
+    session_id = log_in(email, password, client)
+    profile_logged(session_id, client)
+    log_out(session_id, client)
+    reset_token = reset_password_token(email, client)
+    update_password(email, reset_token, new_password, client)
+    log_in(email, new_password, client)
+
+
+class Recorder:
+    """Collects the latency and outcome of every request.
     """
-    response = requests.put('http://localhost:5000/reset_password', 
-                            data={'email': email, 'reset_token': reset_token, 'new_password': new_password})
-    assert response.status_code == 200, f"Failed to update password. Status code: {response.status_code}"
-    assert response.json() == {"email": email, "message": "Password updated"}, "Unexpected response payload"
+
+    def __init__(self) -> None:
+        """Starts with no samples.
+        """
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def call(self, client, name: str, expected: int, data: dict = None,
+             session_id: str = None) -> Result:
+        """
+        Send a request and record it under `name`.
+
+        Args:
+            client: The client to use.
+            name (str): The endpoint, as "METHOD /path".
+            expected (int): The expected status code.
+            data (dict): The form fields.
+            session_id (str): The session cookie to send, if any.
+
+        Returns:
+            Result: The response.
+        """
+        method, path = name.split(' ', 1)
+        start = time.perf_counter()
+        response = client.request(method, path, data, session_id)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._samples.setdefault(name, []).append(
+                (elapsed, response.status_code, expected))
+        return response
+
+    def report(self, duration: float) -> dict:
+        """
+        Summarize the samples per endpoint.
+
+        Args:
+            duration (float): The wall-clock length of the run in seconds.
+
+        Returns:
+            dict: Count, errors, rate-limited and overloaded responses,
+                throughput and latency percentiles (ms) of the requests
+                that were not shed.
+        """
+        def percentile(latencies: list, fraction: float) -> float:
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(len(latencies) * fraction))
+            return round(latencies[index] * 1000, 3)
+
+        endpoints = {}
+        for name, samples in sorted(self._samples.items()):
+            latencies = sorted(elapsed for elapsed, status, _ in samples
+                               if status not in SHED_STATUSES)
+            endpoint = {
+                "count": len(samples),
+                "errors": sum(1 for _, status, expected in samples
+                              if status != expected and
+                              status not in SHED_STATUSES),
+            }
+            for status, key in SHED_STATUSES.items():
+                endpoint[key] = sum(1 for _, s, _ in samples if s == status)
+            endpoint.update({
+                "throughput_rps": round(len(samples) / duration, 2),
+                "p50_ms": percentile(latencies, 0.50),
+                "p90_ms": percentile(latencies, 0.90),
+                "p99_ms": percentile(latencies, 0.99),
+                "max_ms": percentile(latencies, 1.0),
+            })
+            endpoints[name] = endpoint
+        return endpoints
+
+
+def virtual_user(client, recorder: Recorder, index: int, mix: dict) -> None:
+    """
+    Run the flow once for one virtual user, without assertions.
+
+    Args:
+        client: The client to use.
+        recorder (Recorder): Where requests are recorded.
+        index (int): The virtual user's number, used in its email.
+        mix (dict): How many times to repeat the 'profile' and 'login'
+            steps.
+    """
+    email = "vu{}-{}@holberton.io".format(index, os.getpid())
+    password, new_password = "b4l0u", "t4rt1fl3tt3"
+    creds = {'email': email, 'password': password}
+    recorder.call(client, 'POST /users', 200, creds)
+    recorder.call(client, 'POST /sessions', 401,
+                  {'email': email, 'password': new_password})
+    recorder.call(client, 'GET /profile', 403)
+    session_id = None
+    for _ in range(max(1, mix.get('login', 1))):
+        session_id = recorder.call(
+            client, 'POST /sessions', 200, creds).session_id
+    for _ in range(mix.get('profile', 1)):
+        recorder.call(client, 'GET /profile', 200, session_id=session_id)
+    recorder.call(client, 'DELETE /sessions', 200, session_id=session_id)
+    response = recorder.call(client, 'POST /reset_password', 200,
+                             {'email': email})
+    reset_token = (response.payload or {}).get('reset_token')
+    recorder.call(client, 'PUT /reset_password', 200, {
+        'email': email, 'reset_token': reset_token,
+        'new_password': new_password})
+    recorder.call(client, 'POST /sessions', 200,
+                  {'email': email, 'password': new_password})
+
+
+def benchmark(client_factory, users: int, concurrency: int,
+              mix: dict) -> dict:
+    """
+    Run `users` virtual users, `concurrency` at a time.
+
+    Args:
+        client_factory: Returns a new client for each worker thread.
+        users (int): The number of virtual users.
+        concurrency (int): The number of concurrent virtual users.
+        mix (dict): The step repetitions passed to virtual_user.
+
+    Returns:
+        dict: The run settings and the per-endpoint report.
+    """
+    recorder = Recorder()
+    local = threading.local()
+
+    def run(index: int) -> None:
+        if not hasattr(local, 'client'):
+            local.client = client_factory()
+        virtual_user(local.client, recorder, index, mix)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, range(users)))
+    duration = time.perf_counter() - start
+    endpoints = recorder.report(duration)
+    results = {
+        "users": users,
+        "concurrency": concurrency,
+        "mix": mix,
+        "duration_s": round(duration, 3),
+    }
+    hints = {
+        "rate_limited": "LOGIN_CLIENT_RATE=0 and LOGIN_EMAIL_RATE=0",
+        "overloaded": "a larger BCRYPT_MAX_QUEUE and BCRYPT_QUEUE_TIMEOUT",
+    }
+    for status, key in SHED_STATUSES.items():
+        results[key] = sum(e[key] for e in endpoints.values())
+        if results[key]:
+            print("warning: {} requests got {}; run the server with {}, "
+                  "the later steps of those users failed too".format(
+                      results[key], status, hints[key]), file=sys.stderr)
+    results["endpoints"] = endpoints
+    return results
+
+
+def parse_mix(value: str) -> dict:
+    """
+    Parse a mix such as "profile=5,login=2".
+
+    Args:
+        value (str): Comma separated step=count pairs.
+
+    Returns:
+        dict: The step repetitions.
+    """
+    mix = {}
+    for item in filter(None, value.split(',')):
+        step, _, count = item.partition('=')
+        mix[step.strip()] = int(count)
+    return mix
+
+
+def flask_client_factory():
+    """
+    Import the app against a scratch database with login rate limits
+    off and a password gate queueing every request rather than shedding
+    any, and return a factory of in-process clients.
+    """
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault('DB_URL', 'sqlite:///' + os.path.join(tmp, 'b.db'))
+    os.environ.setdefault('LOGIN_CLIENT_RATE', '0')
+    os.environ.setdefault('LOGIN_EMAIL_RATE', '0')
+    os.environ.setdefault('BCRYPT_MAX_QUEUE', '10000')
+    os.environ.setdefault('BCRYPT_QUEUE_TIMEOUT', '600')
+    os.environ.setdefault('BCRYPT_TIMEOUT', '600')
+    from app import app
+    return lambda: FlaskClient(app)
+
 
 EMAIL = "guillaume@holberton.io"
 PASSWD = "b4l0u"
 NEW_PASSWD = "t4rt1fl3tt3"
 
 if __name__ == "__main__":
-    register_user(EMAIL, PASSWD)
-    log_in_wrong_password(EMAIL, NEW_PASSWD)
-    profile_unlogged()
-    session_id = log_in(EMAIL, PASSWD)
-    profile_logged(session_id)
-    log_out(session_id)
-    reset_token = reset_password_token(EMAIL)
-    update_password(EMAIL, reset_token, NEW_PASSWD)
-    log_in(EMAIL, NEW_PASSWD)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', default=BASE_URL,
+                        help="server URL, or 'flask' for in-process")
+    parser.add_argument('--users', type=int,
+                        help="number of virtual users (benchmark mode)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mix', type=parse_mix, default={},
+                        help="step repetitions, e.g. profile=5,login=2")
+    parser.add_argument('--output', help="write the JSON report here")
+    args = parser.parse_args()
+
+    if args.target == 'flask':
+        factory = flask_client_factory()
+    else:
+        def factory():
+            return HttpClient(args.target)
+    if args.users is None:
+        run_flow(factory(), EMAIL, PASSWD, NEW_PASSWD)
+        sys.exit(0)
+    results = benchmark(factory, args.users, args.concurrency, args.mix)
+    results["target"] = args.target
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
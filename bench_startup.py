@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Cold-start import time of each project's entry point
+
+Usage: ./bench_startup.py [runs] [slack]
+
+Imports each entry point in a fresh interpreter under
+``python -X importtime``, from an empty working directory, and keeps
+the best of `runs` cumulative import times. Also checks that modules
+which should load lazily were not imported. Exits with 1 if an entry
+point is over its budget multiplied by `slack`, or imported one of them.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODELS = os.path.join(HERE, "0x01-Basic_authentication")
+
+# (project, module, AUTH_TYPE, budget in ms, modules that must not load)
+ENTRY_POINTS = (
+    ("0x00-personal_data", "filtered_logger", None, 50,
+     ("mysql", "mysql.connector")),
+    ("0x01-Basic_authentication", "wsgi", "basic_auth", 400, ()),
+    ("0x02-Session_authentication", "wsgi", "session_auth", 400,
+     ("api.v1.auth.basic_auth", "api.v1.auth.signed_session_auth")),
+    ("0x02-Session_authentication", "wsgi", "basic_auth", 400,
+     ("api.v1.auth.session_auth",)),
+    ("0x03-user_authentication_service", "app", None, 800, ()),
+)
+
+
+def import_times(project: str, module: str, auth_type: str,
+                 cwd: str) -> dict:
+    """Imports a module in a new interpreter.
+
+    Returns:
+        dict: The cumulative import time in microseconds of every module
+            loaded, by name, or None if the import failed.
+    """
+    env = dict(os.environ, SESSION_NAME="_my_session_id",
+               PYTHONPATH=os.pathsep.join((os.path.join(HERE, project),
+                                           MODELS)))
+    env.pop("AUTH_TYPE", None)
+    if auth_type is not None:
+        env["AUTH_TYPE"] = auth_type
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=cwd, env=env, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1])
+        return None
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    slack = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    failed = False
+    print("{:<34} {:<16} {:<20} {:>9} {:>9}".format(
+        "project", "module", "AUTH_TYPE", "best ms", "budget"))
+    for project, module, auth_type, budget, absent in ENTRY_POINTS:
+        best = float("inf")
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as cwd:
+                times = import_times(project, module, auth_type, cwd)
+            if times is None:
+                break
+            best = min(best, times[module] / 1e3)
+        if times is None:
+            print("{:<34} {:<16} import failed".format(project, module))
+            failed = True
+            continue
+        loaded = [name for name in absent if name in times]
+        over = best > budget * slack
+        print("{:<34} {:<16} {:<20} {:9.1f} {:9.0f}{}".format(
+            project, module, auth_type or "-", best, budget * slack,
+            "  OVER BUDGET" if over else ""))
+        for name in loaded:
+            print("    {} should not be imported".format(name))
+        failed = failed or over or len(loaded) > 0
+    if failed:
+        sys.exit(1)